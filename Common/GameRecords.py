@@ -0,0 +1,272 @@
+import json
+import mmap
+import os
+import random
+import sys
+from array import array
+from collections import namedtuple
+
+
+def set_game_seed(seed):
+    # Both the opponents' random tie-breaks and the Q-learning exploration draw from these
+    import numpy as np  # Here, so the GUIs can start without numpy until an engine needs it
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+
+class GameResultLog:
+    # Append-only JSONL log with one record per finished game, so interrupted runs keep their results.
+    # With a GameRecordWriter for the same games, the record file is synced before every log write, so a
+    # crash never leaves the log ahead of it, and on resume the record file is cut back to the logged games.
+    def __init__(self, filename, flush_every=20, resume=True, records=None):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.records = records
+        self.pending = []  # Lines written at the next flush, after the records
+        self.completed = self.completed_games() if resume else set()
+        if records is not None:
+            records.keep_games(len(self.completed))  # Games recorded but never logged are played again
+        self.file = open(filename, 'a' if resume else 'w')
+        if resume and self.file.tell() > 0:
+            with open(filename, 'rb') as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b'\n':
+                    self.file.write('\n')  # Terminate a partial record left by an interrupted run
+
+    def completed_games(self):
+        return {(record["Matchup"], record["Game"]) for record in read_game_results(self.filename)}
+
+    def is_recorded(self, matchup, game):
+        return (matchup, game) in self.completed
+
+    def append(self, record):
+        self.pending.append(json.dumps(record) + '\n')
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.records is not None:
+            self.records.flush()
+        self.file.write(''.join(self.pending))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_game_results(filename):
+    if not os.path.exists(filename):
+        return
+    with open(filename) as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A run killed mid-write leaves a partial last line
+
+
+def aggregate_game_results(filename, matchups, games):
+    # Win/draw totals per matchup, streamed from the log; duplicate records of a game count once
+    results = {description: {"Matchup": description, "AI 1": ai1.__class__.__name__, "AI 1 Wins": 0,
+                             "AI 2": ai2.__class__.__name__, "AI 2 Wins": 0, "Draws": 0}
+               for ai1, ai2, description in matchups}
+    seen = set()
+    for record in read_game_results(filename):
+        key = (record["Matchup"], record["Game"])
+        if record["Matchup"] not in results or record["Game"] >= games or key in seen:
+            continue
+        seen.add(key)
+        result = results[record["Matchup"]]
+        winner = record.get(record["Winner"])  # Name of the AI that played the winning colour
+        if winner == result["AI 1"]:
+            result["AI 1 Wins"] += 1
+        elif winner == result["AI 2"]:
+            result["AI 2 Wins"] += 1
+        else:
+            result["Draws"] += 1
+    return list(results.values())
+
+
+# Compact binary game records. A file starts with its format's magic and a version byte, followed by:
+#   name entry: 0x00 | player id | name length | UTF-8 name   (once per player, before its first game)
+#   game entry: 0x01 | X id | O id | result << 6 | move count | seed as LEB128 varint | packed moves
+# Moves are packed move_bits each, least significant first. Result is 0 for a draw, 1 if X won, 2 if O won.
+RECORD_VERSION = 1
+NAME_ENTRY, GAME_ENTRY = 0, 1
+RESULTS = ('Draw', 'X', 'O')
+GameRecord = namedtuple('GameRecord', ['x', 'o', 'seed', 'winner', 'moves'])
+RecordFormat = namedtuple('RecordFormat', ['magic', 'move_bits'])
+CONNECT4_RECORDS = RecordFormat(b'C4GR', 3)  # Moves are columns
+TICTACTOE_RECORDS = RecordFormat(b'TTGR', 4)  # Moves are cells (row * 3 + col)
+
+
+class GameRecordWriter:
+    def __init__(self, filename, record_format, resume=True):
+        self.filename = filename
+        self.record_format = record_format
+        self.player_ids = {}
+        if resume and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            names, end = {}, 0
+            for end, _ in iterate_record_entries(filename, record_format, names):
+                pass
+            self.player_ids = {name: player for player, name in names.items()}
+            self.file = open(filename, 'ab')
+            self.file.truncate(end)  # Drop a partial entry left by an interrupted run
+        else:
+            self.file = open(filename, 'wb')
+            self.file.write(record_format.magic + bytes([RECORD_VERSION]))
+
+    def player_id(self, name):
+        if name not in self.player_ids:
+            encoded = name.encode('utf-8')
+            self.player_ids[name] = len(self.player_ids)
+            self.file.write(bytes([NAME_ENTRY, self.player_ids[name], len(encoded)]) + encoded)
+        return self.player_ids[name]
+
+    def write(self, x, o, seed, winner, moves):
+        x_id, o_id = self.player_id(x), self.player_id(o)
+        entry = bytearray([GAME_ENTRY, x_id, o_id, RESULTS.index(winner) << 6 | len(moves)])
+        while True:  # Seed as an unsigned LEB128 varint
+            byte = seed & 0x7f
+            seed >>= 7
+            entry.append(byte | (0x80 if seed else 0))
+            if not seed:
+                break
+        move_bits = self.record_format.move_bits
+        packed = 0
+        for index, move in enumerate(moves):
+            packed |= move << (index * move_bits)
+        entry += packed.to_bytes((len(moves) * move_bits + 7) // 8, 'little')
+        self.file.write(entry)
+
+    def keep_games(self, count):
+        # Drops every game entry after the first `count` (and the names only they introduced)
+        self.file.flush()
+        names, games = {}, 0
+        for end, record in iterate_record_entries(self.filename, self.record_format, names):
+            games += record is not None
+            if games == count:
+                self.player_ids = {name: player for player, name in names.items()}
+                self.file.truncate(end)
+                return
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def read_game_records(filename, record_format):
+    # Streams GameRecord tuples from a memory-mapped file without loading it all into memory
+    for _, record in iterate_record_entries(filename, record_format, {}):
+        if record is not None:
+            yield record
+
+
+def iterate_record_entries(filename, record_format, names):
+    # Yields (offset after the entry, GameRecord or None for name entries) for every complete entry
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return  # Created but interrupted before its header was written: no games (and mmap can't map it)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = check_header(data, filename, record_format)
+            yield offset, None
+            while True:
+                entry = decode_entry(data, offset, record_format.move_bits, names)
+                if entry is None:
+                    break  # End of file, or an entry truncated by an interrupted run
+                offset, record = entry
+                yield offset, record
+
+
+def check_header(data, filename, record_format):
+    # Offset of the first entry
+    if data[:len(record_format.magic)] != record_format.magic:
+        raise ValueError(f"{filename} is not a game record file of this format")
+    return len(record_format.magic) + 1
+
+
+def decode_entry(data, offset, move_bits, names):
+    # (offset after the entry, GameRecord or None for a name entry, which is added to names) for the entry
+    # at offset, or None if the data ends before the entry does
+    if offset + 3 > len(data):
+        return None
+    if data[offset] == NAME_ENTRY:
+        player, length = data[offset + 1], data[offset + 2]
+        if offset + 3 + length > len(data):
+            return None
+        names[player] = data[offset + 3:offset + 3 + length].decode('utf-8')
+        return offset + 3 + length, None
+    if offset + 4 > len(data):
+        return None
+    x_id, o_id, result = data[offset + 1], data[offset + 2], data[offset + 3]
+    offset += 4
+    seed, shift, byte = 0, 0, 0x80
+    while offset < len(data):
+        byte = data[offset]
+        offset += 1
+        seed |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    if byte & 0x80:
+        return None
+    count = result & 0x3f
+    size = (count * move_bits + 7) // 8
+    if offset + size > len(data):
+        return None
+    packed = int.from_bytes(data[offset:offset + size], 'little')
+    mask = (1 << move_bits) - 1
+    moves = [(packed >> (index * move_bits)) & mask for index in range(count)]
+    return offset + size, GameRecord(names[x_id], names[o_id], seed, RESULTS[result >> 6], moves)
+
+
+class GameRecordIndex:
+    # Random access to the games of a record file without decoding them all: it keeps one offset per game
+    # (8 bytes) and decodes a game from the memory-mapped file when it is asked for
+    def __init__(self, filename, record_format):
+        self.move_bits = record_format.move_bits
+        self.names = {}
+        self.offsets = array('Q')
+        self.file = open(filename, 'rb')
+        self.data = None
+        if os.fstat(self.file.fileno()).st_size == 0:
+            return
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = check_header(self.data, filename, record_format)
+        while True:
+            entry = decode_entry(self.data, offset, self.move_bits, self.names)
+            if entry is None:
+                break
+            if entry[1] is not None:
+                self.offsets.append(offset)
+            offset = entry[0]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        # Player names all precede their first game, so every name a game needs is already known
+        return decode_entry(self.data, self.offsets[index], self.move_bits, self.names)[1]
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.file.close()
+
+def main():
+    # Usage: python GameRecords.py <records file>  -- prints one line per recorded game, of either game
+    with open(sys.argv[1], 'rb') as file:
+        magic = file.read(4)
+    record_format = CONNECT4_RECORDS if magic == CONNECT4_RECORDS.magic else TICTACTOE_RECORDS
+    for record in read_game_records(sys.argv[1], record_format):
+        print(record.x, record.o, record.seed, record.winner, ' '.join(map(str, record.moves)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import csv
+import math
+from itertools import combinations
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_from_score(score):
+    return -400 * math.log10(1 / score - 1)
+
+
+class PairingStats:
+    def __init__(self, ai1, ai2):
+        self.ai1 = ai1
+        self.ai2 = ai2
+        self.wins = 0  # Wins, draws and losses from ai1's point of view
+        self.draws = 0
+        self.losses = 0
+
+    def add(self, result):
+        if result == 1:
+            self.wins += 1
+        elif result == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def score_and_variance(self):
+        score = (self.wins + 0.5 * self.draws) / self.games
+        variance = (self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2
+                    + self.losses * score ** 2) / self.games
+        return score, variance
+
+    def elo(self, z=1.96):
+        # Elo difference of ai1 over ai2 with a normal-approximation confidence interval
+        score, variance = self.score_and_variance()
+        margin = z * math.sqrt(variance / self.games)
+        clamp = 0.5 / self.games  # Keeps 100% and 0% scores finite
+        low, mid, high = (min(max(value, clamp), 1 - clamp) for value in (score - margin, score, score + margin))
+        return elo_from_score(mid), elo_from_score(low), elo_from_score(high)
+
+    def llr(self, elo0, elo1):
+        # Generalized SPRT log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation
+        score, variance = self.score_and_variance()
+        s0, s1 = expected_score(elo0), expected_score(elo1)
+        if variance == 0:
+            variance = 1e-6  # Every game had the same result
+        return self.games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+
+class Tournament:
+    def __init__(self, play_game, max_games=500, min_games=20, elo_margin=50, alpha=0.05, beta=0.05, ci_target=25):
+        self.play_game = play_game  # play_game(x_player, o_player) -> 1 if X wins, 0 if O wins, 0.5 for a draw
+        self.max_games = max_games
+        self.min_games = min_games
+        self.elo_margin = elo_margin  # SPRT decides between "ai1 is elo_margin weaker" and "elo_margin stronger"
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+        self.ci_target = ci_target  # Also stop once the Elo interval is narrower than +-ci_target
+
+    def is_decided(self, stats):
+        if stats.games < self.min_games:
+            return None
+        llr = stats.llr(-self.elo_margin, self.elo_margin)
+        if llr >= self.upper_bound:
+            return 'H1'
+        if llr <= self.lower_bound:
+            return 'H0'
+        elo, low, high = stats.elo()
+        if (high - low) / 2 <= self.ci_target:
+            return 'CI'
+        return None
+
+    def run_pairing(self, ai1, ai2):
+        stats = PairingStats(ai1, ai2)
+        stats.stopped_by = 'max games'
+        while stats.games < self.max_games:
+            # Alternate colours so neither side keeps the first-move advantage
+            if stats.games % 2 == 0:
+                stats.add(self.play_game(ai1, ai2))
+            else:
+                stats.add(1 - self.play_game(ai2, ai1))
+            decision = self.is_decided(stats)
+            if decision is not None:
+                stats.stopped_by = decision
+                break
+        return stats
+
+    def run(self, opponents):
+        pairings = []
+        for ai1, ai2 in combinations(opponents, 2):
+            print(f"Starting {ai1.__class__.__name__} vs {ai2.__class__.__name__}...")
+            stats = self.run_pairing(ai1, ai2)
+            elo, low, high = stats.elo()
+            print(f"  {stats.games} games, +{stats.wins}={stats.draws}-{stats.losses}, "
+                  f"Elo {elo:+.0f} [{low:+.0f}, {high:+.0f}] ({stats.stopped_by})")
+            pairings.append(stats)
+        return pairings, self.fit_ratings(opponents, pairings)
+
+    def fit_ratings(self, opponents, pairings, iterations=200):
+        # Bradley-Terry ratings by minorization-maximization; each pairing gets one virtual draw so
+        # unbeaten or winless players still have finite ratings
+        names = [opponent.__class__.__name__ for opponent in opponents]
+        points = {name: 0.0 for name in names}
+        games = {}
+        for stats in pairings:
+            name1, name2 = stats.ai1.__class__.__name__, stats.ai2.__class__.__name__
+            points[name1] += stats.wins + 0.5 * stats.draws + 0.5
+            points[name2] += stats.losses + 0.5 * stats.draws + 0.5
+            games[(name1, name2)] = games[(name2, name1)] = stats.games + 1
+        strength = {name: 1.0 for name in names}
+        for _ in range(iterations):
+            for name in names:
+                denominator = sum(count / (strength[name] + strength[other])
+                                  for (player, other), count in games.items() if player == name)
+                if denominator:
+                    strength[name] = points[name] / denominator
+        ratings = {name: 400 * math.log10(strength[name]) for name in names}
+        mean = sum(ratings.values()) / len(ratings)
+        return {name: rating - mean for name, rating in ratings.items()}
+
+
+def log_tournament_results_to_csv(pairings, ratings, filename):
+    with open(filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["AI 1", "AI 2", "Games", "AI 1 Wins", "AI 2 Wins", "Draws", "Elo", "Elo Low", "Elo High", "Stopped By"])
+        for stats in pairings:
+            elo, low, high = stats.elo()
+            writer.writerow([stats.ai1.__class__.__name__, stats.ai2.__class__.__name__, stats.games,
+                             stats.wins, stats.losses, stats.draws, round(elo), round(low), round(high), stats.stopped_by])
+    ratings_filename = filename.replace('.csv', '_ratings.csv')
+    with open(ratings_filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["AI", "Elo"])
+        for name, rating in sorted(ratings.items(), key=lambda item: -item[1]):
+            writer.writerow([name, round(rating)])
+    print(f"Results saved to {filename} and {ratings_filename}")
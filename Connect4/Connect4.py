@@ -1,25 +1,72 @@
+import time
+STARTED = time.time()  # For the startup report
 import tkinter as tk
 from tkinter import messagebox, ttk
+import glob
+import os
 import random
-from Connect4Opponents import *
+import sys
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from Connect4Game import Connect4Game
+from Connect4SearchCache import SearchCache, search_cache_filename
+from GameRecords import CONNECT4_RECORDS, GameRecordWriter, GameResultLog, aggregate_game_results, set_game_seed
+from Tournament import Tournament, log_tournament_results_to_csv
 import csv
 
-class Connect4GUI:
-    def __init__(self, master):
+
+class BoardCanvas:
+    # Retained-mode board drawing: the grid and one piece oval per cell are created once, and each draw only
+    # reconfigures the cells that changed since the last one
+    COLORS = {'X': 'red', 'O': 'yellow'}
+
+    def __init__(self, canvas, rows, cols, cell_width, cell_height):
+        self.canvas = canvas
+        self.cols = cols
+        self.pieces = []  # Oval item id per cell, row by row
+        for row in range(rows):
+            for col in range(cols):
+                x1 = col * cell_width
+                y1 = row * cell_height
+                canvas.create_rectangle(x1, y1, x1 + cell_width, y1 + cell_height, fill='grey', outline='white')
+                x1 += cell_width / 4
+                y1 += cell_height / 4
+                self.pieces.append(canvas.create_oval(x1, y1, x1 + cell_width / 2, y1 + cell_height / 2,
+                                                      outline='white', state='hidden'))
+        self.drawn = ['-'] * (rows * cols)  # What each cell currently shows
+
+    def draw(self, board):
+        for row, line in enumerate(board):
+            for col, cell in enumerate(line):
+                index = row * self.cols + col
+                if self.drawn[index] == cell:
+                    continue
+                if cell == '-':
+                    self.canvas.itemconfigure(self.pieces[index], state='hidden')
+                else:
+                    self.canvas.itemconfigure(self.pieces[index], fill=self.COLORS[cell], state='normal')
+                self.drawn[index] = cell
+
+
+class Connect4GUI(Connect4Game):
+    def __init__(self, master, warm_up=False):
         self.master = master
         self.master.geometry("500x500")  # Adjusted for Connect 4 board size
         self.master.title("Connect 4")
-        self.q_learning_opponent = QLearningOpponent()
+        # The engine modules (numpy, tqdm, the Q-table, the opening book and tablebase) load the first time an
+        # algorithm is selected or used, so a Human vs Human game never pays for them
+        self.engines = None  # The Connect4Opponents module once imported
+        self.opponents = {}  # Algorithm name -> opponent kept between moves (Q-table, MCTS tree, process pools)
+        self.load_lock = threading.RLock()  # The warm-up thread and the GUI can ask for the same engine at once
+        self.search_caches = {}  # Loaded from disk the first time an engine needs one
         # Player and Algorithm Options
         self.player_options = ('Human', 'Computer')
-        self.algorithm_options = ('Minimax', 'Alpha-Beta Pruning', 'Default Opponent', 'Q-Learning')  # Assuming these are the implemented algorithms
+        self.algorithm_options = ('Minimax', 'Alpha-Beta Pruning', 'Parallel Minimax', 'Parallel Alpha-Beta', 'Negamax (PVS)', 'MCTS', 'Default Opponent', 'Q-Learning')  # Assuming these are the implemented algorithms
         self.is_ai_playing = False
         self.initialize_options()
 
         # Board Setup
-        self.rows = 6
-        self.cols = 7
-        self.win_length = 4
+        Connect4Game.__init__(self, rows=6, cols=7, win_length=4)
         self.canvas_height = 360
         self.canvas_width = 420
         self.cell_width = self.canvas_width / self.cols
@@ -28,9 +75,12 @@ class Connect4GUI:
         self.canvas = tk.Canvas(master, width=self.canvas_width, height=self.canvas_height, bg='grey')
         self.canvas.grid(row=3, column=0, columnspan=4, pady=0) 
         self.canvas.bind("<Button-1>", self.handle_click)
+        self.board_canvas = BoardCanvas(self.canvas, self.rows, self.cols, self.cell_width, self.cell_height)
 
         # Game Initialization
         self.initialize_game()
+        if warm_up:
+            self.warm_up(self.algorithm_options)
 
     def initialize_options(self):
         # Player 1 Selection
@@ -44,6 +94,7 @@ class Connect4GUI:
         self.player1_algorithm = ttk.Combobox(self.master, width=20, values=self.algorithm_options, state="readonly")
         self.player1_algorithm.grid(column=3, row=0)
         self.player1_algorithm.set('Minimax')  # Default value
+        self.player1_algorithm.bind("<<ComboboxSelected>>", lambda event: self.warm_up([self.player1_algorithm.get()]))
 
         # Player 2 Selection
         ttk.Label(self.master, text="Player 2:").grid(column=0, row=1, padx=10, pady=10)
@@ -56,55 +107,96 @@ class Connect4GUI:
         self.player2_algorithm = ttk.Combobox(self.master, width=20, values=self.algorithm_options, state="readonly")
         self.player2_algorithm.grid(column=3, row=1)
         self.player2_algorithm.set('Minimax')  # Default value
+        self.player2_algorithm.bind("<<ComboboxSelected>>", lambda event: self.warm_up([self.player2_algorithm.get()]))
 
         # Inside initialize_options method of Connect4GUI class
         train_ai_button = ttk.Button(self.master, text="Train AI", command=self.train_ai)
         train_ai_button.grid(column=1, row=2, columnspan=2, pady=10)
+
+        train_offline_button = ttk.Button(self.master, text="Train AI Offline", command=self.train_ai_offline)
+        train_offline_button.grid(column=1, row=4, columnspan=2, pady=10)
         
         analysis_button = ttk.Button(self.master, text="Analyze Performance", command=self.start_performance_analysis)
         analysis_button.grid(column=2, row=2, columnspan=4, pady=10)
 
+        tournament_button = ttk.Button(self.master, text="Run Tournament", command=self.start_tournament)
+        tournament_button.grid(column=3, row=4, pady=10)  # Beside Train Offline; row 2 is full
+
         # Start Game Button
         play_button = ttk.Button(self.master, text="Start Game", command=self.initialize_game)
         play_button.grid(column=0, row=2, columnspan=2, pady=10)
 
-    def start_performance_analysis(self):
+    def start_performance_analysis(self, games=500, resume=True):
+        from tqdm import tqdm
         self.is_ai_playing = True
-        games = 500  # Number of games for the analysis
+        engines = self.load_engines()
         matchups = [
-            (MinimaxOpponent(), DefaultOpponent(), "Minimax vs Default"),
-            (AlphaBetaOpponent(), DefaultOpponent(), "Alpha Beta vs Default"),
-            (DefaultOpponent(), QLearningOpponent(), "Default vs Q-Learning"),
-            (QLearningOpponent(), MinimaxOpponent(), "Q-Learning vs Minimax"),
-            (QLearningOpponent(), AlphaBetaOpponent(), "Q-Learning vs Alpha Beta"),
-            (MinimaxOpponent(), AlphaBetaOpponent(), "Minimax vs Alpha Beta")
+            (engines.MinimaxOpponent(), engines.DefaultOpponent(), "Minimax vs Default"),
+            (engines.AlphaBetaOpponent(), engines.DefaultOpponent(), "Alpha Beta vs Default"),
+            (engines.DefaultOpponent(), engines.QLearningOpponent(), "Default vs Q-Learning"),
+            (engines.QLearningOpponent(), engines.MinimaxOpponent(), "Q-Learning vs Minimax"),
+            (engines.QLearningOpponent(), engines.AlphaBetaOpponent(), "Q-Learning vs Alpha Beta"),
+            (engines.MinimaxOpponent(), engines.AlphaBetaOpponent(), "Minimax vs Alpha Beta"),
+            (engines.MCTSOpponent(), engines.DefaultOpponent(), "MCTS vs Default"),
+            (engines.MCTSOpponent(), engines.AlphaBetaOpponent(), "MCTS vs Alpha Beta")
         ]
+        self.attach_search_caches([ai for matchup in matchups for ai in matchup[:2]])
 
-        results = []
-
-        for ai1, ai2, description in matchups:
-            result = {"Matchup": description, "AI 1": ai1.__class__.__name__, "AI 2": ai2.__class__.__name__, "Details": []}
+        # Every finished game is appended to the log, so an interrupted run resumes where it stopped
+        records = GameRecordWriter(f"performance_analysis_connect4_{games}.c4r", CONNECT4_RECORDS, resume=resume)  # Full move lists
+        log = GameResultLog(f"performance_analysis_connect4_{games}.jsonl", resume=resume, records=records)
+        for matchup_index, (ai1, ai2, description) in enumerate(matchups):
             print(f"Starting {description}...")
-            ai1_wins = 0
-            ai2_wins = 0
-            draws = 0
-            for _ in tqdm(range(games)):
+            for game in tqdm(range(games)):
+                if log.is_recorded(description, game):
+                    continue
+                seed = matchup_index * games + game
+                set_game_seed(seed)
+                nodes = ai1.nodes + ai2.nodes
+                start = time.time()
                 winner = self.play_ai_vs_ai_game(ai1, ai2)
-                if winner == ai1.__class__.__name__:
-                    ai1_wins += 1
-                elif winner == ai2.__class__.__name__:
-                    ai2_wins += 1
-                else:  # Assume draws for any other result
-                    draws += 1
-            result["AI 1 Wins"] = ai1_wins
-            result["AI 2 Wins"] = ai2_wins
-            result["Draws"] = draws
-            results.append(result)
+                winner_color = next((color for color, name in self.players.items() if name == winner), "Draw")
+                records.write(self.players['X'], self.players['O'], seed, winner_color, self.moves)
+                log.append({
+                    "Matchup": description,
+                    "Game": game,
+                    "X": self.players['X'],
+                    "O": self.players['O'],
+                    "Seed": seed,
+                    "Winner": winner_color,
+                    "Moves": len(self.moves),
+                    "Time": round(time.time() - start, 4),
+                    "Nodes": ai1.nodes + ai2.nodes - nodes
+                })
+        log.close()
+        records.close()
+        self.flush_search_caches()
+        results = aggregate_game_results(log.filename, matchups, games)
 
         # Log results to CSV
         self.log_matchup_results_to_csv(results, games)
         self.is_ai_playing = False
 
+    def start_tournament(self):
+        # Round robin that stops each pairing as soon as the SPRT or the Elo interval settles it
+        self.is_ai_playing = True
+        engines = self.load_engines()
+        opponents = [engines.MinimaxOpponent(), engines.AlphaBetaOpponent(), engines.NegamaxOpponent(), engines.MCTSOpponent(),
+                     engines.DefaultOpponent(), engines.QLearningOpponent()]
+        self.attach_search_caches(opponents)
+        pairings, ratings = Tournament(self.play_tournament_game).run(opponents)
+        self.flush_search_caches()
+        log_tournament_results_to_csv(pairings, ratings, "tournament_connect4.csv")
+        self.is_ai_playing = False
+
+    def play_tournament_game(self, ai_x, ai_o):
+        winner = self.play_ai_vs_ai_game(ai_x, ai_o, q_learning_as_o=False)  # The tournament alternates colours itself
+        if winner == ai_x.__class__.__name__:
+            return 1
+        elif winner == ai_o.__class__.__name__:
+            return 0
+        return 0.5
+
     def log_matchup_results_to_csv(self, results, games):
         filename = f"performance_analysis_connect4_{games}.csv"
         with open(filename, mode='w', newline='') as file:
@@ -124,25 +216,26 @@ class Connect4GUI:
 
         print(f"Results saved to {filename}")
     
-    def play_ai_vs_ai_game(self, ai_player_1, ai_player_2):
+    def play_ai_vs_ai_game(self, ai_player_1, ai_player_2, q_learning_as_o=True):
         self.reset_game()  # Resets the game to start a new match
         self.turn = 'X'  # Assuming 'X' starts. Adjust if your game logic differs.
 
         # Determine which AI is playing as 'X' and which as 'O'
-        if isinstance(ai_player_1, QLearningOpponent):
+        if q_learning_as_o and isinstance(ai_player_1, self.load_engines().QLearningOpponent):
             ai_X, ai_O = ai_player_2, ai_player_1
         else:
             ai_X, ai_O = ai_player_1, ai_player_2
-        
+        self.players = {'X': ai_X.__class__.__name__, 'O': ai_O.__class__.__name__}
+
         while not self.game_over:
             # Determine current AI based on turn
             current_ai = ai_X if self.turn == 'X' else ai_O
             # Get the move from the current AI
-            move = current_ai.choose_move(self, current_ai)
+            move = current_ai.choose_move(self, self.turn)
 
             player_moved = self.drop_piece(move)
             if player_moved:
-                if self.check_win():
+                if self.check_win_at(self.board, *self.last_move):
                     return current_ai.__class__.__name__
                 elif self.is_full():
                     return "Draw"
@@ -152,45 +245,23 @@ class Connect4GUI:
                 return "Draw"
 
     def initialize_game(self):
-        self.board = [['-' for _ in range(self.cols)] for _ in range(self.rows)]
-        self.turn = 'X'  # Player 1 always starts
-        self.game_over = False
+        self.reset_board()
         self.draw_board()
         if self.player1_type.get() == "Computer":
             self.ai_move()  # If Player 1 is a computer, make the first move
 
     def draw_board(self):
-        self.canvas.delete('all')  # Clear canvas before redrawing
-        for row in range(self.rows):
-            for col in range(self.cols):
-                x1 = col * self.cell_width
-                y1 = row * self.cell_height
-                x2 = x1 + self.cell_width
-                y2 = y1 + self.cell_height
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill='grey', outline='white')
-                if self.board[row][col] != '-':
-                    self.draw_piece(row, col, self.board[row][col])
-
-    def draw_piece(self, row, col, player):
-        x1 = col * self.cell_width + self.cell_width / 4
-        y1 = row * self.cell_height + self.cell_height / 4
-        x2 = x1 + self.cell_width / 2
-        y2 = y1 + self.cell_height / 2
-        color = 'red' if player == 'X' else 'yellow'
-        self.canvas.create_oval(x1, y1, x2, y2, fill=color, outline='white')
+        self.board_canvas.draw(self.board)  # Only the cells that changed are touched
 
     def handle_click(self, event):
         if self.game_over:
             self.reset_game()
         else:
             col = int(event.x // self.cell_width)
-            self.play(col)
-            self.draw_board()  # To show the last move
+            self.play(col)  # Draws the move itself
 
     def reset_game(self):
-        self.board = [['-' for _ in range(self.cols)] for _ in range(self.rows)]
-        self.turn = 'X'  # Player 1 always starts
-        self.game_over = False
+        self.reset_board()
         self.draw_board()
 
     def play(self, col):
@@ -198,54 +269,16 @@ class Connect4GUI:
             self.reset_game()
             return
         player_moved = self.drop_piece(col)
-        self.draw_board()
         if player_moved:
+            self.draw_board()
             self.check_and_handle_game_end()
             self.change_turn()
             if not self.game_over:
                 self.ai_move()
         else:
-            self.draw_board()
             if not self.is_ai_playing:
                 messagebox.showwarning("Error", "Column is full! Try a different one.")
 
-    def drop_piece(self, col):
-        if self.board[0][col] != '-':
-            return False  # Column full
-        for row in reversed(range(self.rows)):
-            if self.board[row][col] == '-':
-                self.board[row][col] = self.turn
-                break
-        return True
-
-    def is_full(self):
-        return all(self.board[0][col] != '-' for col in range(self.cols))
-
-    def check_line(self, start_row, start_col, d_row, d_col):
-        count = 0
-        row, col = start_row, start_col
-        while 0 <= row < self.rows and 0 <= col < self.cols and self.board[row][col] == self.turn:
-            count += 1
-            if count == self.win_length:
-                return True
-            row += d_row
-            col += d_col
-        return False
-    
-    def check_win(self):
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if self.board[row][col] == self.turn:
-                    if (self.check_line(row, col, 0, 1) or  # Horizontal
-                        self.check_line(row, col, 1, 0) or  # Vertical
-                        self.check_line(row, col, 1, 1) or  # Diagonal /
-                        self.check_line(row, col, 1, -1)):  # Diagonal \
-                        return True
-        return False
-
-    def change_turn(self):
-        self.turn = 'O' if self.turn == 'X' else 'X'
-
     def check_and_handle_game_end(self):
         if self.check_win():
             self.game_over = True
@@ -267,15 +300,9 @@ class Connect4GUI:
         # Choose the algorithm based on player type and selected algorithm
         algorithm = self.player1_algorithm.get() if player == 'X' else self.player2_algorithm.get()
         move = random.randint(0, self.cols-1)
-        if algorithm == 'Default Opponent':
-            opponent = DefaultOpponent()
-        elif algorithm == 'Minimax':
-            opponent = MinimaxOpponent()
-        elif algorithm == 'Alpha-Beta Pruning':
-            opponent = AlphaBetaOpponent()
-        elif algorithm == 'Q-Learning':
+        opponent = self.get_opponent(algorithm)
+        if algorithm == 'Q-Learning':
             prev_state = self.get_state_representation()
-            opponent = self.q_learning_opponent
         move = opponent.choose_move(self, player)
         if move is not None:
             self.play(move)
@@ -290,110 +317,132 @@ class Connect4GUI:
                 reward = -1  # Penalize if the board is full and no one wins
             next_state = self.get_state_representation()
             done = self.game_over  # True if the game is over, otherwise False
-            self.q_learning_opponent.update_q_table(self, prev_state, move, reward, next_state, done)
-    
-    def get_state_representation(self):
-        state = ''
-        for row in self.board:
-            for cell in row:
-                state += cell
-        return state
+            opponent.update_q_table(self, prev_state, move, reward, next_state, done)
+
+    def load_engines(self):
+        # Imports the engine modules on first use, with the opening book and tablebase the searches probe
+        with self.load_lock:
+            if self.engines is None:
+                start = time.time()
+                import Connect4Opponents
+                from Connect4OpeningBook import load_opening_book
+                from Connect4Tablebase import load_tablebase
+                report_timing("Imported engine modules", start)
+                start = time.time()
+                Connect4Opponents.Opponent.opening_book = load_opening_book()  # None until built with Connect4OpeningBook.py
+                Connect4Opponents.Opponent.tablebase = load_tablebase()  # None until built with Connect4Tablebase.py
+                report_timing("Loaded opening book and tablebase", start)
+                self.engines = Connect4Opponents
+        return self.engines
+
+    def get_opponent(self, algorithm):
+        # The opponent playing `algorithm` in the GUI, built (and its Q-table loaded) the first time it is needed
+        with self.load_lock:
+            opponent = self.opponents.get(algorithm)
+            if opponent is None:
+                engines = self.load_engines()
+                start = time.time()
+                if algorithm == 'Default Opponent':
+                    opponent = engines.DefaultOpponent()
+                elif algorithm == 'Minimax':
+                    opponent = engines.MinimaxOpponent()
+                elif algorithm == 'Alpha-Beta Pruning':
+                    opponent = engines.AlphaBetaOpponent()
+                elif algorithm == 'Parallel Minimax':
+                    opponent = engines.ParallelMinimaxOpponent()  # Keeps its process pool between moves
+                elif algorithm == 'Parallel Alpha-Beta':
+                    opponent = engines.ParallelAlphaBetaOpponent()
+                elif algorithm == 'Negamax (PVS)':
+                    opponent = engines.NegamaxOpponent()
+                elif algorithm == 'MCTS':
+                    opponent = engines.MCTSOpponent(processes=os.cpu_count() or 1)  # Kept between moves for tree reuse
+                elif algorithm == 'Q-Learning':
+                    opponent = engines.QLearningOpponent()
+                    report_timing(f"Loaded Q-table ({len(opponent.Q)} states)", start)
+                self.opponents[algorithm] = opponent
+        return opponent
+
+    def warm_up(self, algorithms):
+        # Loads the engines for `algorithms` in a background thread, so the first AI move doesn't wait for them
+        threading.Thread(target=lambda: [self.get_opponent(algorithm) for algorithm in algorithms], daemon=True).start()
 
     def train_ai(self):
         self.is_ai_playing = True
         iterations = 500
+        engines = self.load_engines()
+        q_learning_opponent = self.get_opponent('Q-Learning')
         # Define opponents for training
         opponents = [
-            MinimaxOpponent(),
-            AlphaBetaOpponent(),
-            DefaultOpponent(),
+            engines.MinimaxOpponent(),
+            engines.AlphaBetaOpponent(),
+            engines.DefaultOpponent(),
             # QLearningOpponent()
         ]
+        self.attach_search_caches(opponents)
         # initially explore while training
-        self.q_learning_opponent.epsilon = 1
+        q_learning_opponent.epsilon = 1
         for opponent in opponents:
-            if isinstance(opponent, MinimaxOpponent):
+            if isinstance(opponent, engines.MinimaxOpponent):
                 self.player1_algorithm.set('Minimax')
-            elif isinstance(opponent, AlphaBetaOpponent):
+            elif isinstance(opponent, engines.AlphaBetaOpponent):
                 self.player1_algorithm.set('Alpha-Beta Pruning')
-            elif isinstance(opponent, DefaultOpponent):
+            elif isinstance(opponent, engines.DefaultOpponent):
                 self.player1_algorithm.set('Default Opponent')
                 iterations = 1000000
             print(f"Starting training against {opponent.__class__.__name__}...")
-            self.q_learning_opponent.train(self, iterations, opponent)
+            if hasattr(opponent, 'score_moves'):
+                # Search opponents see the same positions over and over; reuse their root scores
+                cache_file = f"opponent_cache_{opponent.__class__.__name__}_{opponent.depth}_{self.evaluation_signature()}.pkl"
+                cached_opponent = engines.CachedOpponent(opponent, filename=cache_file)
+                q_learning_opponent.train(self, iterations, cached_opponent)
+                cached_opponent.save()
+                print(f"Opponent cache: {cached_opponent.hits} hits, {cached_opponent.misses} misses")
+            else:
+                q_learning_opponent.train(self, iterations, opponent)
 
             # After training
-            self.q_learning_opponent.save_q_table(self.q_learning_opponent.Q)  # Save the learned Q-table
+            q_learning_opponent.save_q_table(q_learning_opponent.Q)  # Save the learned Q-table
+        self.flush_search_caches()
         print("Training complete and Q-table saved.")
         self.is_ai_playing = False
 
-    def evaluate_board(self, board, player):
-        score = 0
-        opp_player = 'X' if player == 'O' else 'O'
-        # Center column preference remains a good heuristic.
-        center_column = [board[i][self.cols // 2] for i in range(self.rows)]
-        center_count = center_column.count(player)  # Assuming AI is 'O'
-        score += center_count * 6  # Slightly increase the weight
-
-        # Evaluate every row, column, and diagonal for potential scores
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if board[row][col] == '-':  # Only evaluate empty spaces for potential moves
-                    score += self.score_position(board, row, col, player)  # Score for AI
-                    score -= self.score_position(board, row, col, opp_player)  # Subtract score for opponent
-        return score
-
-    def score_position(self, board, row, col, player):
-        score = 0
-        opp_player = 'X' if player == 'O' else 'O'
-
-        # Temporarily make the move on the board
-        board[row][col] = player
-        # Horizontal
-        for c in range(max(0, col-3), min(self.cols-3, col+1)):
-            window = board[row][c:c+4]
-            score += self.evaluate_window(window, player)
-        # Vertical
-        if row <= self.rows - 4:
-            window = [board[r][col] for r in range(row, row+4)]
-            score += self.evaluate_window(window, player)
-        # Positive Diagonal
-        if row <= self.rows - 4 and 0 <= col <= self.cols - 4:
-            window = [board[row+i][col+i] for i in range(4)]
-            score += self.evaluate_window(window, player)
-        # Negative Diagonal
-        if row >= 3 and 0 <= col <= self.cols - 4:
-            window = [board[row-i][col+i] for i in range(4)]
-            score += self.evaluate_window(window, player)
-        # Undo the move
-        board[row][col] = '-'
-        return score
-    
-    def evaluate_window(self, window, player):
-        score = 0
-        opp_player = 'X' if player == 'O' else 'O'
-
-        # Count the pieces in the window
-        player_count = window.count(player)
-        opp_count = window.count(opp_player)
-        empty_count = window.count('-')
-
-        # Adjust scoring to prioritize blocking opponent wins
-        if player_count == 3 and empty_count == 1:
-            score += 100  # Favor moves that lead to a win
-        elif opp_count == 3 and empty_count == 1:
-            score -= 150  # Heavily penalize allowing the opponent to get 3 in a row
-        if player_count == 2 and empty_count == 2:
-            score += 10
-        elif opp_count == 2 and empty_count == 2:
-            score -= 50  # Penalize allowing the opponent to get 2 in a row with space
-        return score
+    def attach_search_caches(self, opponents):
+        # Engines start warm from the evaluations and search results saved by earlier runs
+        for opponent in opponents:
+            name = opponent.search_cache_name
+            if name is None:
+                continue
+            if name not in self.search_caches:
+                self.search_caches[name] = SearchCache(search_cache_filename(name, self))
+            opponent.search_cache = self.search_caches[name]
+
+    def flush_search_caches(self):
+        for name, cache in self.search_caches.items():
+            cache.flush()
+            print(f"Search cache {name}: {len(cache.entries)} entries, {cache.hits} hits, {cache.misses} misses")
+
+    def train_ai_offline(self):
+        # Learns from every game stored by earlier analysis runs instead of playing new ones
+        record_files = glob.glob('*.c4r')
+        print(f"Training offline on {len(record_files)} record files...")
+        q_learning_opponent = self.get_opponent('Q-Learning')
+        q_learning_opponent.train_offline(record_files)
+        q_learning_opponent.save_q_table(q_learning_opponent.Q)
+        print("Training complete and Q-table saved.")
+
+
+def report_timing(what, start):
+    print(f"{what} in {time.time() - start:.2f}s", flush=True)
 
 
 def main():
+    # Usage: python Connect4.py [--warm-up]  -- --warm-up loads every engine in the background after startup
+    report_timing("Imported the GUI", STARTED)
+    start = time.time()
     root = tk.Tk()
     root.title("Connect 4")
-    Connect4GUI(root)
+    Connect4GUI(root, warm_up='--warm-up' in sys.argv)
+    report_timing("Window ready", start)
     root.mainloop()
 
 if __name__ == "__main__":
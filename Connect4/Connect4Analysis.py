@@ -0,0 +1,150 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from Connect4Game import Connect4Game
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import set_game_seed
+
+ENGINES = ('minimax', 'alpha-beta', 'negamax', 'mcts', 'default', 'q-learning')
+CHUNK = 64  # Positions per pool task
+
+engine = None  # Built once per worker process
+
+
+def init_worker(engine_name, depth):
+    global engine
+    import Connect4Opponents as engines
+    from Connect4OpeningBook import load_opening_book
+    from Connect4Tablebase import load_tablebase
+    engines.Opponent.opening_book = load_opening_book()
+    engines.Opponent.tablebase = load_tablebase()
+    engine = {
+        'minimax': engines.MinimaxOpponent,
+        'alpha-beta': engines.AlphaBetaOpponent,
+        'negamax': engines.NegamaxOpponent,
+        'mcts': engines.MCTSOpponent,
+        'default': engines.DefaultOpponent,
+        'q-learning': engines.QLearningOpponent,
+    }[engine_name]()
+    if depth is not None:
+        engine.depth = depth
+
+
+def parse_position(text, rows=6, cols=7):
+    # A board string in get_state_representation format (rows top to bottom, 'X', 'O' and '-'), or a move
+    # sequence of 0-based columns, either as digits ("3342") or separated by spaces or commas.
+    # Returns a Connect4Game with the player to move in game.turn; raises ValueError if it isn't a playable position.
+    game = Connect4Game(rows, cols, 4)
+    if len(text) == rows * cols and set(text) <= set('XO-'):
+        game.board = [list(text[row * cols:(row + 1) * cols]) for row in range(rows)]
+        x_count, o_count = text.count('X'), text.count('O')
+        if o_count not in (x_count, x_count - 1):
+            raise ValueError("impossible piece counts")
+        game.turn = 'X' if x_count == o_count else 'O'
+        if any(game.board[row][col] != '-' and game.check_win_at(game.board, row, col)
+               for row in range(rows) for col in range(cols)):
+            raise ValueError("game already won")
+    else:
+        moves = text.replace(',', ' ').split()
+        moves = list(moves[0]) if len(moves) == 1 else moves
+        for move in moves:
+            col = int(move)
+            if not 0 <= col < cols or not game.drop_piece(col):
+                raise ValueError(f"illegal move {move}")
+            if game.check_win():
+                raise ValueError("game already won")
+            game.change_turn()
+    if game.is_full():
+        raise ValueError("board is full")
+    return game
+
+
+def analyze(line_number, text):
+    # One JSON-ready result: the engine's move and score for each playable column, where the engine scores them
+    try:
+        game = parse_position(text)
+    except ValueError as error:
+        return {"line": line_number, "input": text, "error": str(error)}
+    set_game_seed(line_number)  # Tie-breaks depend on the position's line, not on which worker ran it
+    nodes = engine.nodes
+    start = time.time()
+    if hasattr(engine, 'score_moves'):
+        possible_moves = engine.score_moves(game, game.turn)
+        best_move = engine.choose_from_scores(possible_moves)
+        scores = [None] * game.cols
+        for score, col in possible_moves:
+            scores[col] = score
+        score = scores[best_move]
+    else:
+        best_move, score, scores = engine.choose_move(game, game.turn), None, None
+    return {"line": line_number, "input": text, "to_move": game.turn, "best_move": int(best_move), "score": score,
+            "scores": scores, "nodes": engine.nodes - nodes, "time_ms": round((time.time() - start) * 1000, 3)}
+
+
+def analyze_chunk(chunk):
+    return [analyze(line_number, text) for line_number, text in chunk]
+
+
+def read_chunks(lines):
+    chunk = []
+    for line_number, line in enumerate(lines, 1):
+        text = line.strip()
+        if text and not text.startswith('#'):
+            chunk.append((line_number, text))
+            if len(chunk) == CHUNK:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(lines, output, engine_name, depth=None, processes=None):
+    # Results are written in input order while later chunks are still being analysed. Only a few chunks per
+    # process are read ahead, so an input of any size streams through in constant memory.
+    processes = processes or multiprocessing.cpu_count()
+    count = 0
+    start = time.time()
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(engine_name, depth)) as pool:
+        pending = deque()
+        for chunk in read_chunks(lines):
+            pending.append(pool.apply_async(analyze_chunk, (chunk,)))
+            while len(pending) >= processes * 4:
+                count += write_results(pending.popleft().get(), output)
+        while pending:
+            count += write_results(pending.popleft().get(), output)
+    elapsed = time.time() - start
+    print(f"Analysed {count} positions in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s)", file=sys.stderr)
+
+
+def write_results(results, output):
+    output.write(''.join(json.dumps(result) + '\n' for result in results))
+    output.flush()
+    return len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyses Connect4 positions with one of the engines and writes "
+                                                 "one JSON line per position, in input order")
+    parser.add_argument('input', nargs='?', default='-', help="File of positions, one per line (default: stdin)")
+    parser.add_argument('--output', '-o', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--engine', default='alpha-beta', choices=ENGINES)
+    parser.add_argument('--depth', type=int, help="Search depth for minimax, alpha-beta and negamax")
+    parser.add_argument('--processes', type=int, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    lines = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        run(lines, output, args.engine, args.depth, args.processes)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
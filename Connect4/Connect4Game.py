@@ -0,0 +1,161 @@
+import json
+import os
+import zlib
+
+# Tuned weights written by Connect4Tuning.py; the hand-picked defaults apply to any weight not in the file
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "evaluation_weights_connect4.json")
+DEFAULT_WEIGHTS = {"center": 6, "three": 100, "opponent_three": -150, "two": 10, "opponent_two": -50}
+
+
+def load_evaluation_weights(filename=WEIGHTS_FILE):
+    weights = dict(DEFAULT_WEIGHTS)
+    if os.path.exists(filename):
+        with open(filename) as file:
+            weights.update(json.load(file))
+    return weights
+
+
+EVALUATION_WEIGHTS = load_evaluation_weights()
+
+
+class Connect4Game:
+    def __init__(self, rows=6, cols=7, win_length=4, weights=None):
+        self.rows = rows
+        self.cols = cols
+        self.win_length = win_length
+        self.set_weights(weights or EVALUATION_WEIGHTS)
+        self.reset_board()
+
+    def set_weights(self, weights):
+        self.weights = weights
+        self.center_weight = weights["center"]
+        self.window_weights = (weights["three"], weights["opponent_three"], weights["two"], weights["opponent_two"])
+
+    def evaluation_signature(self):
+        # Short tag of the evaluation weights, so stored search results are only reused under the same weights
+        return format(zlib.crc32(json.dumps(self.weights, sort_keys=True).encode()), '08x')
+
+    def reset_board(self):
+        self.board = [['-' for _ in range(self.cols)] for _ in range(self.rows)]
+        self.turn = 'X'  # Player 1 always starts
+        self.game_over = False
+        self.last_move = None  # (row, col) of the most recently dropped piece
+        self.moves = []  # Columns played so far, in order
+
+    def drop_piece(self, col):
+        if self.board[0][col] != '-':
+            return False  # Column full
+        for row in reversed(range(self.rows)):
+            if self.board[row][col] == '-':
+                self.board[row][col] = self.turn
+                self.last_move = (row, col)
+                self.moves.append(col)
+                break
+        return True
+
+    def is_full(self, board=None):
+        board = self.board if board is None else board
+        return all(board[0][col] != '-' for col in range(self.cols))
+
+    def count_in_direction(self, board, row, col, d_row, d_col):
+        # Count consecutive pieces matching board[row][col], not including the cell itself
+        player = board[row][col]
+        count = 0
+        row, col = row + d_row, col + d_col
+        while 0 <= row < self.rows and 0 <= col < self.cols and board[row][col] == player:
+            count += 1
+            row += d_row
+            col += d_col
+        return count
+
+    def check_win_at(self, board, row, col):
+        # Only lines through the last placed piece can have been completed by it,
+        # so look along its four lines instead of scanning the whole board.
+        if board[row][col] == '-':
+            return False
+        for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):  # Horizontal, vertical, both diagonals
+            count = 1 + self.count_in_direction(board, row, col, d_row, d_col) \
+                      + self.count_in_direction(board, row, col, -d_row, -d_col)
+            if count >= self.win_length:
+                return True
+        return False
+
+    def check_win(self):
+        # A win can only come from the last move, and only for the player who made it
+        if self.last_move is None:
+            return False
+        row, col = self.last_move
+        return self.board[row][col] == self.turn and self.check_win_at(self.board, row, col)
+
+    def change_turn(self):
+        self.turn = 'O' if self.turn == 'X' else 'X'
+
+    def get_state_representation(self):
+        state = ''
+        for row in self.board:
+            for cell in row:
+                state += cell
+        return state
+
+    def evaluate_board(self, board, player):
+        score = 0
+        opp_player = 'X' if player == 'O' else 'O'
+        # Center column preference remains a good heuristic.
+        center_column = [board[i][self.cols // 2] for i in range(self.rows)]
+        center_count = center_column.count(player)  # Assuming AI is 'O'
+        score += center_count * self.center_weight  # Slightly increase the weight
+
+        # Evaluate every row, column, and diagonal for potential scores
+        for row in range(self.rows):
+            for col in range(self.cols):
+                if board[row][col] == '-':  # Only evaluate empty spaces for potential moves
+                    score += self.score_position(board, row, col, player)  # Score for AI
+                    score -= self.score_position(board, row, col, opp_player)  # Subtract score for opponent
+        return score
+
+    def score_position(self, board, row, col, player):
+        score = 0
+        opp_player = 'X' if player == 'O' else 'O'
+
+        # Temporarily make the move on the board
+        board[row][col] = player
+        # Horizontal
+        for c in range(max(0, col-3), min(self.cols-3, col+1)):
+            window = board[row][c:c+4]
+            score += self.evaluate_window(window, player)
+        # Vertical
+        if row <= self.rows - 4:
+            window = [board[r][col] for r in range(row, row+4)]
+            score += self.evaluate_window(window, player)
+        # Positive Diagonal
+        if row <= self.rows - 4 and 0 <= col <= self.cols - 4:
+            window = [board[row+i][col+i] for i in range(4)]
+            score += self.evaluate_window(window, player)
+        # Negative Diagonal
+        if row >= 3 and 0 <= col <= self.cols - 4:
+            window = [board[row-i][col+i] for i in range(4)]
+            score += self.evaluate_window(window, player)
+        # Undo the move
+        board[row][col] = '-'
+        return score
+    
+    def evaluate_window(self, window, player):
+        score = 0
+        opp_player = 'X' if player == 'O' else 'O'
+
+        # Count the pieces in the window
+        player_count = window.count(player)
+        opp_count = window.count(opp_player)
+        empty_count = window.count('-')
+
+        three, opponent_three, two, opponent_two = self.window_weights
+        # Adjust scoring to prioritize blocking opponent wins
+        if player_count == 3 and empty_count == 1:
+            score += three  # Favor moves that lead to a win
+        elif opp_count == 3 and empty_count == 1:
+            score += opponent_three  # Heavily penalize allowing the opponent to get 3 in a row
+        if player_count == 2 and empty_count == 2:
+            score += two
+        elif opp_count == 2 and empty_count == 2:
+            score += opponent_two  # Penalize allowing the opponent to get 2 in a row with space
+        return score
@@ -0,0 +1,130 @@
+import os
+import struct
+import sys
+import time
+from Connect4Game import Connect4Game
+from Connect4Opponents import NegamaxOpponent
+from Connect4SearchCache import SearchCache, search_cache_filename
+from Connect4Solver import Position
+
+BOOK_FILE = "opening_book_connect4.bin"
+MAGIC = b'C4OB'
+MISSING = -2 ** 31  # Score stored for a full column
+
+
+def canonical_key(board, player):
+    # Bitboard key of the board or of its mirror image, whichever is smaller, and whether it was the mirror
+    key = Position.from_board(board, player).key()
+    mirrored_key = Position.from_board([row[::-1] for row in board], player).key()
+    return (mirrored_key, True) if mirrored_key < key else (key, False)
+
+
+class OpeningBook:
+    # Per-column scores of every early position, from the point of view of the player to move.
+    # File: MAGIC | rows | cols | entries of (canonical key u64, one i32 score per column), sorted by key
+    def __init__(self, rows=6, cols=7, entries=None):
+        self.rows = rows
+        self.cols = cols
+        self.entries = entries if entries is not None else {}  # canonical key -> tuple of column scores
+        self.hits = 0
+
+    @classmethod
+    def load(cls, filename=BOOK_FILE):
+        with open(filename, 'rb') as file:
+            data = file.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filename} is not an opening book")
+        rows, cols = data[len(MAGIC)], data[len(MAGIC) + 1]
+        entry = struct.Struct(f'<Q{cols}i')
+        book = cls(rows, cols)
+        for key, *scores in entry.iter_unpack(data[len(MAGIC) + 2:]):
+            book.entries[key] = tuple(scores)
+        return book
+
+    def save(self, filename=BOOK_FILE):
+        entry = struct.Struct(f'<Q{self.cols}i')
+        with open(filename, 'wb') as file:
+            file.write(MAGIC + bytes([self.rows, self.cols]))
+            for key in sorted(self.entries):
+                file.write(entry.pack(key, *self.entries[key]))
+
+    def add(self, board, player, scores):
+        key, mirrored = canonical_key(board, player)
+        scores = [MISSING if score is None else score for score in scores]
+        self.entries[key] = tuple(scores[::-1] if mirrored else scores)
+
+    def probe(self, game, player):
+        # (score, col) for every playable column if the position is in the book, otherwise None
+        if (game.rows, game.cols) != (self.rows, self.cols):
+            return None
+        key, mirrored = canonical_key(game.board, player)
+        scores = self.entries.get(key)
+        if scores is None:
+            return None
+        self.hits += 1
+        if mirrored:
+            scores = scores[::-1]
+        return [(score, col) for col, score in enumerate(scores) if score != MISSING]
+
+
+def load_opening_book(filename=BOOK_FILE):
+    return OpeningBook.load(filename) if os.path.exists(filename) else None
+
+
+def score_columns(engine, game, player, depth):
+    # Full-window score of every column, so ties between equally good moves are kept
+    solved_moves = engine.solve_endgame_scores(game, player)
+    if solved_moves is not None:
+        scores = [None] * game.cols
+        for score, col in solved_moves:
+            scores[col] = score
+        return scores
+    opp_player = 'X' if player == 'O' else 'O'
+    scores = []
+    for col in range(game.cols):
+        temp_board, row = engine.simulate_drop_piece_at(game, game.board, col, player)
+        if row is None:
+            scores.append(None)
+            continue
+        scores.append(-engine.negamax(game, temp_board, depth - 1, -engine.INFINITY, engine.INFINITY, opp_player, (row, col)))
+    return scores
+
+
+def build_opening_book(plies=4, depth=6, rows=6, cols=7, filename=BOOK_FILE):
+    # Scores every position reachable in at most `plies` moves, one mirror image per position
+    game = Connect4Game(rows=rows, cols=cols, win_length=4)
+    engine = NegamaxOpponent(depth=depth)
+    # Shares (and fills) the negamax search cache with the games themselves
+    engine.search_cache = SearchCache(search_cache_filename(engine.search_cache_name, game))
+    book = OpeningBook(rows, cols)
+    frontier = {canonical_key(game.board, 'X')[0]: [row[:] for row in game.board]}
+    for ply in range(plies + 1):
+        player = 'X' if ply % 2 == 0 else 'O'
+        start = time.time()
+        next_frontier = {}
+        for board in frontier.values():
+            game.board = board
+            book.add(board, player, score_columns(engine, game, player, depth))
+            if ply == plies:
+                continue
+            for col in range(cols):
+                temp_board, row = engine.simulate_drop_piece_at(game, board, col, player)
+                if row is not None and not game.check_win_at(temp_board, row, col):
+                    next_frontier.setdefault(canonical_key(temp_board, 'O' if player == 'X' else 'X')[0], temp_board)
+        print(f"Ply {ply}: {len(frontier)} positions in {time.time() - start:.1f}s")
+        frontier = next_frontier
+        engine.search_cache.flush()
+    book.save(filename)
+    print(f"Saved {len(book.entries)} positions to {filename}")
+    return book
+
+
+def main():
+    # Usage: python Connect4OpeningBook.py [plies] [search depth]
+    plies = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    build_opening_book(plies, depth)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,205 @@
 import numpy as np
+import math
+import multiprocessing
+import os
 import pickle
 import random
+import sys
+import time
+from collections import OrderedDict
 from tqdm import tqdm
+from Connect4Game import Connect4Game
+from Connect4SearchCache import EXACT, LOWER, UPPER
+from Connect4Solver import Position, Solver
+from Connect4Threats import ThreatAnalysis
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import CONNECT4_RECORDS, read_game_records
 
 class Opponent:
+    WIN_SCORE = 1000000  # Outranks any heuristic score from evaluate_board
+    nodes = 0  # Positions searched over the opponent's lifetime, for analysis logs
+    search_cache = None  # Optional SearchCache carried over from earlier runs
+    search_cache_name = None  # Engines whose scores mean the same thing share a cache file
+    opening_book = None  # Optional OpeningBook probed before searching, shared by every opponent
+    tablebase = None  # Optional Tablebase of exact endgame scores, shared by every opponent
+
     def __init__(self):
         self.depth = 4  # Depth for minimax and alpha-beta pruning
+        self.solver_empty_cells = 14  # Positions with at most this many empty cells are solved exactly
+        self.solver = None  # Created on first use; its transposition table is kept between moves
     
     def choose_move(self, game, player):
         pass
+
+    def choose_from_scores(self, possible_moves):
+        # Picks randomly among the columns sharing the best score
+        best_score = max(score for score, col in possible_moves)
+        return random.choice([col for score, col in possible_moves if score == best_score])
+
+    def solve_endgame_scores(self, game, player):
+        # Exact (score, col) pairs once the remaining game tree is small enough, otherwise None
+        if game.win_length != 4:
+            return None  # The solver's bitboard alignments are specific to four in a row
+        empty_cells = sum(row.count('-') for row in game.board)
+        if empty_cells > self.solver_empty_cells:
+            return None
+        if self.solver is None:
+            self.solver = Solver()
+        scores = self.solver.analyze(Position.from_board(game.board, player))
+        return [(score, col) for col, score in enumerate(scores) if score is not None]
+
+    def known_scores(self, game, player):
+        # (score, col) pairs from the opening book, the tablebase, forcing tactics or the endgame solver, or None
+        # if the position needs a search
+        known_moves = self.opening_book.probe(game, player) if self.opening_book is not None else None
+        if known_moves is None and self.tablebase is not None:
+            known_moves = self.tablebase.probe_moves(game, player)
+        if known_moves is None:
+            known_moves = self.tactical_scores(game, player)
+        return known_moves if known_moves is not None else self.solve_endgame_scores(game, player)
+
+    def analyze_threats(self, game, board, player):
+        # ThreatAnalysis of `board` with `player` to move, or None where its four-in-a-row bitboards don't apply
+        if game.win_length != 4:
+            return None
+        return ThreatAnalysis(Position.from_board(board, player))
+
+    def tactical_scores(self, game, player):
+        # Immediate wins, or moves making a double threat the opponent cannot stop, without any search
+        threats = self.analyze_threats(game, game.board, player)
+        if threats is None:
+            return None
+        if threats.winning_moves:
+            return [(self.WIN_SCORE, col) for col in threats.winning_moves]
+        if not threats.forced_blocks:
+            double_threat_moves = threats.double_threat_moves()
+            if double_threat_moves:
+                return [(self.WIN_SCORE - 2, col) for col in double_threat_moves]
+        return None
+
+    def root_columns(self, game, player):
+        # Columns worth searching at the root: none that ignores an immediate threat or plays right under
+        # one, unless nothing else is left
+        playable = [col for col in range(game.cols) if game.board[0][col] == '-']
+        threats = self.analyze_threats(game, game.board, player)
+        return (threats.safe_moves() if threats is not None else None) or playable
+
+    def known_move(self, game, player):
+        # A book or perfect move without searching, otherwise None
+        known_moves = self.known_scores(game, player)
+        return self.choose_from_scores(known_moves) if known_moves is not None else None
     
-    def simulate_drop_piece(self, game, board, col, player):
-        temp_board = [row[:] for row in board]
+    def cache_key(self, game, board, player):
+        # Bitboard key of the board seen from `player`, or None if there is no cache or it doesn't fit 64 bits
+        if self.search_cache is None or (game.rows + 1) * game.cols > 64:
+            return None
+        return Position.from_board(board, player).key()
+
+    def evaluate(self, game, board, player):
+        # game.evaluate_board, unless the tablebase knows the exact result or the search cache has the score
+        if self.tablebase is not None:
+            exact_score = self.tablebase.evaluate(game, board, player)
+            if exact_score is not None:
+                return exact_score
+        key = self.cache_key(game, board, player)
+        if key is None:
+            return game.evaluate_board(board, player)
+        entry = self.search_cache.probe(key, 0)
+        if entry is not None:
+            return entry[0]
+        score = game.evaluate_board(board, player)
+        self.search_cache.store(key, 0, score)
+        return score
+
+    def cached_root_score(self, game, board, player, search):
+        # Exact score of a root move for minimax-style searches, which only cache the root children
+        key = self.cache_key(game, board, player)
+        entry = self.search_cache.probe(key, self.depth) if key is not None else None
+        if entry is not None:
+            return entry[0]
+        score = search()
+        if key is not None:
+            self.search_cache.store(key, self.depth, score)
+        return score
+
+    def get_open_row(self, game, board, col):
         for row in reversed(range(game.rows)):
-            if temp_board[row][col] == '-':
-                temp_board[row][col] = player
-                return temp_board, True
-        return board, False  # Return the unchanged board and False if the column was full
+            if board[row][col] == '-':
+                return row
+        return None  # Column is full
+
+    def simulate_drop_piece_at(self, game, board, col, player):
+        # Same as simulate_drop_piece, but returns the landing row (None if the column was full)
+        row = self.get_open_row(game, board, col)
+        if row is None:
+            return board, None
+        temp_board = [r[:] for r in board]
+        temp_board[row][col] = player
+        return temp_board, row
+
+    def simulate_drop_piece(self, game, board, col, player):
+        temp_board, row = self.simulate_drop_piece_at(game, board, col, player)
+        return temp_board, row is not None  # Return the unchanged board and False if the column was full
+
+    def is_terminal(self, game, board, last_move):
+        # Only the piece just dropped on the searched board can have ended the game
+        return (last_move is not None and game.check_win_at(board, *last_move)) or game.is_full(board)
 
 class MinimaxOpponent(Opponent):
-    def minimax(self, game, board, depth, player, maximizingPlayer):
-        if depth == 0 or game.check_win() or game.is_full():
-            return game.evaluate_board(board, player)
+    search_cache_name = 'minimax'
+
+    def minimax(self, game, board, depth, player, maximizingPlayer, last_move=None):
+        self.nodes += 1
+        if depth == 0 or self.is_terminal(game, board, last_move):
+            return self.evaluate(game, board, player)
 
         if maximizingPlayer:
             maxEval = float('-inf')
             for col in range(game.cols):
-                temp_board, valid_move = self.simulate_drop_piece(game, board, col, 'O')  # Assuming 'O' is maximizing
-                if valid_move:
-                    eval = self.minimax(game, temp_board, depth-1, player, False)
+                temp_board, row = self.simulate_drop_piece_at(game, board, col, 'O')  # Assuming 'O' is maximizing
+                if row is not None:
+                    eval = self.minimax(game, temp_board, depth-1, player, False, (row, col))
                     maxEval = max(maxEval, eval)
             return maxEval
         else:
             minEval = float('inf')
             for col in range(game.cols):
-                temp_board, valid_move = self.simulate_drop_piece(game, board, col, 'X')  # Assuming 'X' is minimizing
-                if valid_move:
-                    eval = self.minimax(game, temp_board, depth-1, player, True)
+                temp_board, row = self.simulate_drop_piece_at(game, board, col, 'X')  # Assuming 'X' is minimizing
+                if row is not None:
+                    eval = self.minimax(game, temp_board, depth-1, player, True, (row, col))
                     minEval = min(minEval, eval)
             return minEval
 
-    def choose_move(self, game, player):
-        best_score = float('-inf')
+    def score_moves(self, game, player):
+        # (score, col) for every playable column
+        known_moves = self.known_scores(game, player)
+        if known_moves is not None:
+            return known_moves
         possible_moves = []
-        for col in range(game.cols):
-            if game.board[0][col] == '-':
-                temp_board, valid_move = self.simulate_drop_piece(game, game.board, col, player)
-                if valid_move:
-                    score = self.minimax(game, temp_board, self.depth, player, player == 'O')
-                    if score > best_score:
-                        best_score = score
-                        possible_moves = [(score, col)]
-                    elif score == best_score:
-                        possible_moves.append((score, col))
-        if len(possible_moves) > 1:
-            return random.choice([col for score, col in possible_moves])
-        else:
-            return possible_moves[0][1]
+        for col in self.root_columns(game, player):
+            temp_board, row = self.simulate_drop_piece_at(game, game.board, col, player)
+            if row is not None:
+                score = self.cached_root_score(game, temp_board, player, lambda: self.minimax(
+                    game, temp_board, self.depth, player, player == 'O', (row, col)))
+                possible_moves.append((score, col))
+        return possible_moves
+
+    def choose_move(self, game, player):
+        return self.choose_from_scores(self.score_moves(game, player))
 
 class AlphaBetaOpponent(Opponent):
-    def minimax_with_alpha_beta(self, game, board, depth, alpha, beta, player, maximizingPlayer):
-        if depth == 0 or game.check_win() or game.is_full():
-            return game.evaluate_board(board, player)
+    search_cache_name = 'minimax'  # Full-window root scores are the same as plain minimax's
+
+    def minimax_with_alpha_beta(self, game, board, depth, alpha, beta, player, maximizingPlayer, last_move=None):
+        self.nodes += 1
+        if depth == 0 or self.is_terminal(game, board, last_move):
+            return self.evaluate(game, board, player)
         if maximizingPlayer:
             maxEval = float('-inf')
             for col in range(game.cols):
-                temp_board, valid_move = self.simulate_drop_piece(game, board, col, 'O')  # Assuming 'O' is maximizing
-                if valid_move:
-                    eval = self.minimax_with_alpha_beta(game, temp_board, depth-1, alpha, beta, player, False)
+                temp_board, row = self.simulate_drop_piece_at(game, board, col, 'O')  # Assuming 'O' is maximizing
+                if row is not None:
+                    eval = self.minimax_with_alpha_beta(game, temp_board, depth-1, alpha, beta, player, False, (row, col))
                     maxEval = max(maxEval, eval)
                     alpha = max(alpha, eval)
                     if beta <= alpha:
@@ -76,73 +208,456 @@ class AlphaBetaOpponent(Opponent):
         else:
             minEval = float('inf')
             for col in range(game.cols):
-                temp_board, valid_move = self.simulate_drop_piece(game, board, col, 'X')  # Assuming 'X' is minimizing
-                if valid_move:
-                    eval = self.minimax_with_alpha_beta(game, temp_board, depth-1, alpha, beta, player, True)
+                temp_board, row = self.simulate_drop_piece_at(game, board, col, 'X')  # Assuming 'X' is minimizing
+                if row is not None:
+                    eval = self.minimax_with_alpha_beta(game, temp_board, depth-1, alpha, beta, player, True, (row, col))
                     minEval = min(minEval, eval)
                     beta = min(beta, eval)
                     if beta <= alpha:
                         break
             return minEval
         
-    def choose_move(self, game, player):
-        best_score = float('-inf')
+    def score_moves(self, game, player):
+        # (score, col) for every playable column
+        known_moves = self.known_scores(game, player)
+        if known_moves is not None:
+            return known_moves
         possible_moves = []
-        for col in range(game.cols):
-            if game.board[0][col] == '-':
-                temp_board, valid_move = self.simulate_drop_piece(game, game.board, col, player)
-                if valid_move:
-                    score = self.minimax_with_alpha_beta(game, temp_board, self.depth, float('-inf'), float('inf'), player, player == 'O')
-                    if score > best_score:
-                        best_score = score
-                        possible_moves = [(score, col)]
-                    elif score == best_score:
-                        possible_moves.append((score, col))
-        if len(possible_moves) > 1:
-            return random.choice([col for score, col in possible_moves])
+        for col in self.root_columns(game, player):
+            temp_board, row = self.simulate_drop_piece_at(game, game.board, col, player)
+            if row is not None:
+                score = self.cached_root_score(game, temp_board, player, lambda: self.minimax_with_alpha_beta(
+                    game, temp_board, self.depth, float('-inf'), float('inf'), player, player == 'O', (row, col)))
+                possible_moves.append((score, col))
+        return possible_moves
+
+    def choose_move(self, game, player):
+        return self.choose_from_scores(self.score_moves(game, player))
+
+class ParallelRootSearch:
+    # Mixed into MinimaxOpponent/AlphaBetaOpponent to search the root columns in a persistent process pool
+    algorithm = None
+
+    def __init__(self, processes=None):
+        super().__init__()
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = None
+        self.shared_alpha = None  # Best root score found so far, read by workers when a job starts
+
+    def get_pool(self):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self.pool = multiprocessing.Pool(self.processes, initializer=init_root_worker,
+                                             initargs=(self.shared_alpha,))
+        return self.pool
+
+    def choose_move(self, game, player):
+        known_move = self.known_move(game, player)
+        if known_move is not None:
+            return known_move
+        pool = self.get_pool()
+        self.shared_alpha.value = float('-inf')
+        jobs = []
+        # Center columns first so that a good bound is shared early
+        for col in sorted(self.root_columns(game, player), key=lambda col: abs(col - game.cols // 2)):
+            temp_board, row = self.simulate_drop_piece_at(game, game.board, col, player)
+            if row is not None:
+                args = (self.algorithm, game.rows, game.cols, game.win_length, temp_board, self.depth, player, (row, col))
+                jobs.append((col, pool.apply_async(root_search_worker, args)))
+        return self.choose_from_scores([(job.get(), col) for col, job in jobs])
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+
+class ParallelMinimaxOpponent(ParallelRootSearch, MinimaxOpponent):
+    algorithm = 'minimax'
+
+
+class ParallelAlphaBetaOpponent(ParallelRootSearch, AlphaBetaOpponent):
+    algorithm = 'alpha-beta'
+
+
+shared_root_alpha = None  # Set in each pool process by init_root_worker
+
+
+def init_root_worker(shared_alpha):
+    global shared_root_alpha
+    shared_root_alpha = shared_alpha
+
+
+def root_search_worker(algorithm, rows, cols, win_length, board, depth, player, last_move):
+    # Runs in a pool process; scores one root move on a headless copy of the game
+    game = Connect4Game(rows, cols, win_length)
+    if algorithm == 'minimax':
+        return MinimaxOpponent().minimax(game, board, depth, player, player == 'O', last_move)
+    # Only moves scoring at least the best so far matter; searching just below it keeps
+    # ties with the best move exact so the random tie-break sees all of them
+    alpha = shared_root_alpha.value - 1
+    score = AlphaBetaOpponent().minimax_with_alpha_beta(game, board, depth, alpha, float('inf'),
+                                                        player, player == 'O', last_move)
+    with shared_root_alpha.get_lock():
+        if score > shared_root_alpha.value:
+            shared_root_alpha.value = score
+    return score
+
+
+class CachedOpponent(Opponent):
+    # Remembers a search opponent's root scores per position, so positions that come up again (as they
+    # do constantly while training) skip the search; the random tie-break still runs on every move
+    def __init__(self, opponent, max_entries=200000, filename=None):
+        self.opponent = opponent
+        self.max_entries = max_entries
+        self.filename = filename  # Optional pickle the cache is loaded from and saved to
+        self.cache = OrderedDict()  # (state, player) -> [(score, col), ...], least recently used first
+        self.hits = 0
+        self.misses = 0
+        if filename is not None:
+            try:
+                with open(filename, 'rb') as f:
+                    self.cache = pickle.load(f)
+            except FileNotFoundError:
+                pass
+
+    def choose_move(self, game, player):
+        key = (game.get_state_representation(), player)
+        possible_moves = self.cache.get(key)
+        if possible_moves is None:
+            self.misses += 1
+            possible_moves = self.opponent.score_moves(game, player)
+            self.cache[key] = possible_moves
+            if len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
         else:
-            return possible_moves[0][1]
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return self.choose_from_scores(possible_moves)
+
+    def save(self):
+        if self.filename is not None:
+            with open(self.filename, 'wb') as f:
+                pickle.dump(self.cache, f)
+
+
+class NegamaxOpponent(Opponent):
+    INFINITY = 10 ** 9  # Integer bounds keep the null windows (alpha, alpha + 1) well defined
+    search_cache_name = 'negamax'
+
+    def __init__(self, depth=5, aspiration_window=50):
+        super().__init__()
+        self.depth = depth  # Plies searched from the root, including the root move
+        self.aspiration_window = aspiration_window  # Half-width of the window around the previous score
+
+    def ordered_columns(self, game, first=None):
+        # Center columns first, and the previous best move ahead of everything else
+        columns = sorted(range(game.cols), key=lambda col: abs(col - game.cols // 2))
+        if first is not None:
+            columns.remove(first)
+            columns.insert(0, first)
+        return columns
+
+    def negamax(self, game, board, depth, alpha, beta, player, last_move=None):
+        self.nodes += 1
+        # Scores are always from the point of view of `player`, the side to move on `board`
+        if last_move is not None and game.check_win_at(board, *last_move):
+            return -(self.WIN_SCORE + depth)  # The opponent just won; losing later is less bad
+        if depth == 0 or game.is_full(board):
+            return self.evaluate(game, board, player)
+        columns = None
+        threats = self.analyze_threats(game, board, player)
+        if threats is not None:
+            # Forcing positions are resolved statically, with exactly the score the full search would reach
+            if threats.winning_moves:
+                return self.WIN_SCORE + depth - 1
+            if depth >= 2:
+                if threats.is_lost():
+                    return -(self.WIN_SCORE + depth - 2)
+                if threats.forced_blocks:
+                    columns = threats.forced_blocks  # Every other move loses at once, which can't beat the block
+                elif depth >= 3 and threats.double_threat_moves():
+                    return self.WIN_SCORE + depth - 3
+        # The search cache doubles as a transposition table: stored bounds can cut off, the stored move goes first
+        key = self.cache_key(game, board, player)
+        entry = self.search_cache.probe(key, depth) if key is not None else None
+        first = None
+        if entry is not None:
+            score, bound, first = entry
+            if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                return score
+        alpha_orig = alpha
+        opp_player = 'X' if player == 'O' else 'O'
+        best, best_move = -self.INFINITY, None
+        searched_first = False
+        for col in columns or self.ordered_columns(game, first):
+            temp_board, row = self.simulate_drop_piece_at(game, board, col, player)
+            if row is None:
+                continue
+            if not searched_first:
+                # Principal variation: full window
+                score = -self.negamax(game, temp_board, depth-1, -beta, -alpha, opp_player, (row, col))
+                searched_first = True
+            else:
+                # Null window to prove the move is no better than the current best
+                score = -self.negamax(game, temp_board, depth-1, -alpha-1, -alpha, opp_player, (row, col))
+                if alpha < score < beta:
+                    score = -self.negamax(game, temp_board, depth-1, -beta, -score, opp_player, (row, col))
+            if score > best:
+                best, best_move = score, col
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        if key is not None:
+            bound = UPPER if best <= alpha_orig else LOWER if best >= beta else EXACT
+            self.search_cache.store(key, depth, best, bound, best_move)
+        return best
+
+    def search_root(self, game, player, depth, alpha, beta, first=None):
+        opp_player = 'X' if player == 'O' else 'O'
+        best_score, best_move = -self.INFINITY, None
+        for col in self.ordered_columns(game, first):
+            temp_board, row = self.simulate_drop_piece_at(game, game.board, col, player)
+            if row is None:
+                continue
+            if best_move is None:
+                score = -self.negamax(game, temp_board, depth-1, -beta, -alpha, opp_player, (row, col))
+            else:
+                # Root alpha is carried over, so later root moves only need a null window
+                score = -self.negamax(game, temp_board, depth-1, -alpha-1, -alpha, opp_player, (row, col))
+                if alpha < score < beta:
+                    score = -self.negamax(game, temp_board, depth-1, -beta, -score, opp_player, (row, col))
+            if best_move is None or score > best_score:
+                best_score, best_move = score, col
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best_score, best_move
+
+    def score_moves(self, game, player):
+        # (score, col) for every playable column. Each root move gets the full window, so unlike choose_move's
+        # aspiration search every score is exact, not just the best one.
+        known_moves = self.known_scores(game, player)
+        if known_moves is not None:
+            return known_moves
+        opp_player = 'X' if player == 'O' else 'O'
+        possible_moves = []
+        for col in self.ordered_columns(game):
+            temp_board, row = self.simulate_drop_piece_at(game, game.board, col, player)
+            if row is not None:
+                score = -self.negamax(game, temp_board, self.depth-1, -self.INFINITY, self.INFINITY,
+                                      opp_player, (row, col))
+                possible_moves.append((score, col))
+        return possible_moves
+
+    def choose_move(self, game, player):
+        known_move = self.known_move(game, player)
+        if known_move is not None:
+            return known_move
+        best_move, prev_score = None, None
+        # Iterative deepening: each iteration's score centres the next aspiration window
+        for depth in range(1, self.depth + 1):
+            if prev_score is None:
+                alpha, beta = -self.INFINITY, self.INFINITY
+            else:
+                alpha, beta = prev_score - self.aspiration_window, prev_score + self.aspiration_window
+            while True:
+                score, move = self.search_root(game, player, depth, alpha, beta, best_move)
+                if score <= alpha and alpha > -self.INFINITY:
+                    alpha = -self.INFINITY  # Failed low, re-search with the window opened downwards
+                elif score >= beta and beta < self.INFINITY:
+                    beta = self.INFINITY  # Failed high, re-search with the window opened upwards
+                else:
+                    break
+            best_move, prev_score = move, score
+        return best_move
 
 class DefaultOpponent(Opponent):
     def get_move(self, game, player):
         for col in range(game.cols):
-            temp_board, valid_move = self.simulate_drop_piece(game, game.board, col, player)
-            if valid_move and self.check_win_on_board(game, temp_board, player):
+            row = self.get_open_row(game, game.board, col)
+            if row is None:
+                continue
+            # Try the move in place and only check the lines through the dropped piece
+            game.board[row][col] = player
+            is_win = game.check_win_at(game.board, row, col)
+            game.board[row][col] = '-'
+            if is_win:
                 return col
-    
+
     def choose_move(self, game, player):
-        opp_player = 'X' if player == 'O' else 'O'
-        winning_move = self.get_move(game, player)  # Check for a winning move first
-        if winning_move:
-            return winning_move
-        blocking_move = self.get_move(game, opp_player) # If no winning move, check for a blocking move
-        if blocking_move:
-            return blocking_move
-        # No immediate win or block, choose center column if available
-        if game.board[game.rows-1][game.cols//2] == '-':
-            return game.cols//2
-        # Choose a random move as a fallback
         valid_moves = [col for col in range(game.cols) if game.board[0][col] == '-']
-        return random.choice(valid_moves) if valid_moves else None
-    
-    def check_win_on_board(self, game, board, player):
-        for row in range(game.rows):    # Check all rows for a win
-            for col in range(game.cols - 3):
-                if board[row][col] == player and board[row][col + 1] == player and board[row][col + 2] == player and board[row][col + 3] == player:
-                    return True
-        for col in range(game.cols):    # Check all columns for a win
-            for row in range(game.rows - 3):
-                if board[row][col] == player and board[row + 1][col] == player and board[row + 2][col] == player and board[row + 3][col] == player:
-                    return True
-        for row in range(game.rows - 3):    # Check positive diagonal
-            for col in range(game.cols - 3):
-                if board[row][col] == player and board[row + 1][col + 1] == player and board[row + 2][col + 2] == player and board[row + 3][col + 3] == player:
-                    return True
-        for row in range(3, game.rows): # Check negative diagonal
-            for col in range(game.cols - 3):
-                if board[row][col] == player and board[row - 1][col + 1] == player and board[row - 2][col + 2] == player and board[row - 3][col + 3] == player:
-                    return True
-        return False
+        threats = self.analyze_threats(game, game.board, player)
+        if threats is None:
+            # Boards without four in a row: immediate win, then block, then centre, then random
+            opp_player = 'X' if player == 'O' else 'O'
+            for move in (self.get_move(game, player), self.get_move(game, opp_player)):
+                if move is not None:
+                    return move
+            if game.board[game.rows-1][game.cols//2] == '-':
+                return game.cols//2
+            return random.choice(valid_moves) if valid_moves else None
+        if threats.winning_moves:
+            return random.choice(threats.winning_moves)
+        safe_moves = threats.safe_moves()
+        if threats.forced_blocks:
+            return random.choice(safe_moves or threats.forced_blocks)
+        double_threat_moves = threats.double_threat_moves()
+        if double_threat_moves:
+            return random.choice(double_threat_moves)
+        if not safe_moves:
+            return random.choice(valid_moves) if valid_moves else None
+        # No immediate tactics: centre column if it's safe, otherwise a move that keeps the threat parity ours
+        if game.cols//2 in safe_moves and game.board[game.rows-1][game.cols//2] == '-':
+            return game.cols//2
+        parity_moves = [col for col in safe_moves if threats.parity_after(col) == player]
+        return random.choice(parity_moves or safe_moves)
+
+class MCTSNode:
+    __slots__ = ('move', 'key', 'children', 'untried', 'visits', 'wins', 'result')
+
+    def __init__(self, move, position, result=None):
+        self.move = move  # Column played to reach this node
+        self.key = position.key()
+        self.children = {}
+        # Moves still to expand; none once the game is over
+        self.untried = [] if result is not None else [col for col in range(position.width) if position.can_play(col)]
+        self.visits = 0
+        self.wins = 0.0  # From the point of view of the player who played `move`
+        self.result = result  # 1 if `move` won the game, 0.5 if it filled the board, None otherwise
+
+
+class MCTSOpponent(Opponent):
+    def __init__(self, playouts=2000, time_limit=None, exploration=1.4, playout_policy='default', processes=1):
+        super().__init__()
+        if playouts is None and time_limit is None:
+            raise ValueError("MCTSOpponent needs a playout budget, a time limit or both")
+        self.playouts = playouts  # Playout budget per move and process; None to rely on time_limit only
+        self.time_limit = time_limit  # Optional budget in seconds per move, checked between playouts
+        self.exploration = exploration  # UCT exploration constant
+        self.playout_policy = playout_policy  # 'random' or 'default' (win, block, avoid losing moves)
+        self.processes = processes
+        self.pool = None  # Created on the first parallel search and reused between moves
+        self.root = None  # Tree from the previous move, reused when the game continues from it
+
+    def playable_moves(self, position, moves_mask):
+        return [moves_mask & position.column_mask(col) for col in range(position.width)
+                if moves_mask & position.column_mask(col)]
+
+    def playout(self, position):
+        # Plays to the end of the game; returns 1 if the player to move at `position` wins, 0 if they lose
+        position = position.copy()
+        cells = position.width * position.height
+        outcome = 1  # Flips each ply so it always refers to the starting player
+        while position.moves < cells:
+            if position.can_win_next():
+                return outcome
+            if self.playout_policy == 'default':
+                moves_mask = position.possible_non_losing_moves()
+                if moves_mask == 0:
+                    return 1 - outcome  # Every move hands the opponent a win
+            else:
+                moves_mask = position.possible()
+            position.play(random.choice(self.playable_moves(position, moves_mask)))
+            outcome = 1 - outcome
+        return 0.5
+
+    def expand(self, node, position):
+        col = node.untried.pop(random.randrange(len(node.untried)))
+        result = 1 if position.is_winning_move(col) else None
+        position.play_col(col)
+        if result is None and position.moves == position.width * position.height:
+            result = 0.5
+        child = MCTSNode(col, position, result)
+        node.children[col] = child
+        return child
+
+    def select_child(self, node):
+        log_visits = math.log(node.visits)
+        return max(node.children.values(), key=lambda child: child.wins / child.visits
+                   + self.exploration * math.sqrt(log_visits / child.visits))
+
+    def run_playout(self, root, root_position):
+        self.nodes += 1
+        node, position = root, root_position.copy()
+        path = [node]
+        while not node.untried and node.children:
+            node = self.select_child(node)
+            position.play_col(node.move)
+            path.append(node)
+        if node.untried:
+            node = self.expand(node, position)
+            path.append(node)
+        value = node.result if node.result is not None else 1 - self.playout(position)
+        for visited in reversed(path):
+            visited.visits += 1
+            visited.wins += value
+            value = 1 - value
+
+    def search(self, root, position, playouts):
+        # playouts=None searches until the time limit runs out
+        start = time.time()
+        count = 0
+        while ((playouts is None or count < playouts) and
+               (self.time_limit is None or time.time() - start < self.time_limit)):
+            self.run_playout(root, position)
+            count += 1
+        return root
+
+    def reuse_tree(self, position):
+        # The new position is usually two plies below the previous root (our move, then theirs)
+        key = position.key()
+        frontier = [self.root] if self.root is not None else []
+        for _ in range(3):
+            for node in frontier:
+                if node.key == key:
+                    return node
+            frontier = [child for node in frontier for child in node.children.values()]
+        return MCTSNode(None, position)
+
+    def score_moves(self, game, player):
+        # (visits, col) for every root move searched; the most visited move is the one played
+        if game.win_length != 4:
+            # The playouts run on the solver's four-in-a-row bitboard; other boards get the Default Opponent's move
+            return [(0, DefaultOpponent().choose_move(game, player))]
+        position = Position.from_board(game.board, player)
+        root = self.reuse_tree(position)
+        stats = {}
+        if self.processes > 1:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.processes - 1)
+            # Root parallelism: independent trees in the workers, merged by visit counts
+            jobs = [self.pool.apply_async(mcts_worker, (position, self.playouts, self.time_limit, self.exploration,
+                                                        self.playout_policy, random.randrange(2 ** 32)))
+                    for _ in range(self.processes - 1)]
+            self.search(root, position, self.playouts)
+            for job in jobs:
+                for col, (visits, wins) in job.get().items():
+                    merged_visits, merged_wins = stats.get(col, (0, 0.0))
+                    stats[col] = (merged_visits + visits, merged_wins + wins)
+        else:
+            self.search(root, position, self.playouts)
+        for col, child in root.children.items():
+            merged_visits, merged_wins = stats.get(col, (0, 0.0))
+            stats[col] = (merged_visits + child.visits, merged_wins + child.wins)
+        self.root = root
+        return [(visits, col) for col, (visits, _) in stats.items()]
+
+    def choose_move(self, game, player):
+        return self.choose_from_scores(self.score_moves(game, player))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+
+def mcts_worker(position, playouts, time_limit, exploration, playout_policy, seed):
+    # Runs in a pool process; returns {column: (visits, wins)} for the root's children
+    random.seed(seed)
+    searcher = MCTSOpponent(playouts, time_limit, exploration, playout_policy)
+    root = searcher.search(MCTSNode(None, position), position, playouts)
+    return {col: (child.visits, child.wins) for col, child in root.children.items()}
 
 class QLearningOpponent(Opponent):
     def __init__(self, epsilon=0, alpha=0.6, gamma=0.9, epsilon_decay=0.995, epsilon_min=0.01):
@@ -155,8 +670,13 @@ class QLearningOpponent(Opponent):
         self.load_q_table()
 
     def get_state(self, game):
-        # Convert the game board to a tuple to use as a dictionary key
-        return tuple(tuple(row) for row in game.board)
+        # Same key format as the states passed to update_q_table, so learned values are found
+        return game.get_state_representation()
+
+    def score_moves(self, game, player):
+        # (Q-value, col) for every playable column
+        state = self.get_state(game)
+        return [(self.Q.get((state, col), 0), col) for col in range(game.cols) if game.board[0][col] == '-']
 
     def choose_move(self, game, player):
         state = self.get_state(game)
@@ -184,7 +704,7 @@ class QLearningOpponent(Opponent):
                     # Capture the state before making a move
                     prev_state = game.get_state_representation()
                     # Choose and make a move based on the current policy or exploration
-                    action = game.q_learning_opponent.choose_move(game, game.turn)
+                    action = self.choose_move(game, game.turn)
                     game.play(action)
                     # Capture the new state and compute the reward after the move
                     next_state = game.get_state_representation()
@@ -196,13 +716,72 @@ class QLearningOpponent(Opponent):
                         reward = -0.5  # Slight negative reward for a draw
                     done = game.game_over  # Check if the game is over
                     # Update the Q-table based on the move
-                    game.q_learning_opponent.update_q_table(game, prev_state, action, reward, next_state, done)
+                    self.update_q_table(game, prev_state, action, reward, next_state, done)
                 else:
                     # Opponent's turn to play
                     col = opponent.choose_move(game, game.turn)
                     game.play(col)
             self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
 
+    def load_transitions(self, record_files, player='O', rows=6, cols=7):
+        # Replays recorded games into (state, action, reward, next state, done) arrays for `player`'s moves.
+        # Boards are encoded as (X stones, O stones) bitmasks with cell index row * cols + col.
+        states, actions, rewards, next_states, dones = [], [], [], [], []
+        for filename in record_files:
+            for record in read_game_records(filename, CONNECT4_RECORDS):
+                x_stones = o_stones = 0
+                heights = [rows - 1] * cols
+                boards = [(0, 0)]
+                for ply, col in enumerate(record.moves):
+                    cell = heights[col] * cols + col
+                    heights[col] -= 1
+                    if ply % 2 == 0:
+                        x_stones |= 1 << cell
+                    else:
+                        o_stones |= 1 << cell
+                    boards.append((x_stones, o_stones))
+                last_ply = len(record.moves) - 1
+                for ply in range(0 if player == 'X' else 1, len(record.moves), 2):
+                    states.append(boards[ply])
+                    actions.append(record.moves[ply])
+                    if ply >= last_ply - 1:  # The game ended with this move or the opponent's reply
+                        rewards.append(1 if record.winner == player else (-0.5 if record.winner == 'Draw' else -1))
+                        next_states.append(boards[-1])
+                        dones.append(True)
+                    else:
+                        rewards.append(0)
+                        next_states.append(boards[ply + 2])
+                        dones.append(False)
+        return (np.array(states, dtype=np.uint64).reshape(-1, 2), np.array(actions, dtype=np.int64),
+                np.array(rewards, dtype=np.float64), np.array(next_states, dtype=np.uint64).reshape(-1, 2),
+                np.array(dones, dtype=bool))
+
+    def bitmasks_to_state(self, x_stones, o_stones, rows=6, cols=7):
+        # Inverse of the encoding in load_transitions, in the get_state_representation format
+        return ''.join('X' if x_stones >> cell & 1 else 'O' if o_stones >> cell & 1 else '-'
+                       for cell in range(rows * cols))
+
+    def train_offline(self, record_files, passes=10, player='O', rows=6, cols=7):
+        # Batch Q-learning over recorded games: every pass updates all transitions at once with NumPy
+        states, actions, rewards, next_states, dones = self.load_transitions(record_files, player, rows, cols)
+        if len(states) == 0:
+            return
+        boards, inverse = np.unique(np.concatenate([states, next_states]), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        state_index, next_state_index = inverse[:len(states)], inverse[len(states):]
+        names = [self.bitmasks_to_state(int(x_stones), int(o_stones), rows, cols) for x_stones, o_stones in boards]
+        q_values = np.array([[self.Q.get((name, col), 0) for col in range(cols)] for name in names], dtype=np.float64)
+        # Transitions sharing a (state, action) pair are averaged into a single update per pass
+        pairs, pair_index, pair_counts = np.unique(state_index * cols + actions, return_inverse=True, return_counts=True)
+        flat_q_values = q_values.reshape(-1)
+        for _ in tqdm(range(passes), desc="Offline training"):
+            targets = rewards + self.gamma * np.where(dones, 0, q_values[next_state_index].max(axis=1))
+            mean_targets = np.bincount(pair_index.reshape(-1), weights=targets, minlength=len(pairs)) / pair_counts
+            flat_q_values[pairs] += self.alpha * (mean_targets - flat_q_values[pairs])
+        for pair in pairs:
+            state, col = divmod(int(pair), cols)
+            self.Q[(names[state], col)] = float(q_values[state, col])
+
     def save_q_table(self, q_table):
         with open('q_table_connect4.pkl', 'wb') as f:
             pickle.dump(q_table, f)
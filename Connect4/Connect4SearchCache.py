@@ -0,0 +1,133 @@
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The cache file is a flat sequence of fixed-size entries:
+#   position key (u64) | depth (u8) | bound (u8) | best move (i8, -1 for none) | score (i64)
+# Depth 0 entries are leaf evaluations; deeper ones are search results at exactly that remaining depth.
+ENTRY = struct.Struct('<QBBbq')
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def search_cache_filename(name, game):
+    # Scores depend on the evaluation weights, so each set of weights gets its own file
+    return f"search_cache_connect4_{name}_{game.evaluation_signature()}.bin"
+
+
+@contextmanager
+def locked(filename):
+    # Exclusive lock on a side file, held by writers while they append to or rewrite the cache file
+    with open(filename + '.lock', 'a+b') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_entries(filename):
+    # combined key -> (score, bound, best move) for every whole entry in the file, later entries replacing
+    # earlier ones and moving to the end; a partial last entry is skipped
+    entries = {}
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return entries, 0
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        size = len(data)
+        for key, depth, bound, best_move, score in ENTRY.iter_unpack(data[:size - size % ENTRY.size]):
+            combined_key = key * 256 + depth
+            entries.pop(combined_key, None)
+            entries[combined_key] = (score, bound, None if best_move < 0 else best_move)
+    return entries, size
+
+
+class SearchCache:
+    # Position-keyed evaluations and search results kept on disk between runs. Writers append whole entries
+    # under a lock file, so any number of processes can share the file. Past twice max_entries it is rewritten,
+    # still under the lock, from what is on disk at that moment (every process's entries, not just this one's).
+    # read_only caches load the file but never write to it.
+    def __init__(self, filename, max_entries=500000, flush_every=5000, read_only=False):
+        self.filename = filename
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.read_only = read_only
+        self.entries = {}  # key * 256 + depth -> (score, bound, best move), oldest first
+        self.pending = []  # Packed entries not yet written to the file
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        entries, size = read_entries(self.filename)
+        for combined_key, (score, bound, best_move) in entries.items():
+            self.remember(*divmod(combined_key, 256), score, bound, best_move)
+        if not self.read_only and (size % ENTRY.size or size // ENTRY.size > len(entries)):
+            with locked(self.filename):
+                self.compact()
+
+    def compact(self):
+        # Rewrites the file with one entry per position, keeping the max_entries most recent. Callers hold the
+        # lock, so nothing is appended between reading the file and replacing it. Readers that already opened
+        # it keep the old copy.
+        entries, _ = read_entries(self.filename)
+        keep = list(entries.items())[-self.max_entries:]
+        handle, temp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)), suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(b''.join(ENTRY.pack(combined_key // 256, combined_key % 256, bound,
+                                               -1 if best_move is None else best_move, score)
+                                    for combined_key, (score, bound, best_move) in keep))
+            os.chmod(temp_filename, 0o644)  # mkstemp creates it private to this user
+            os.replace(temp_filename, self.filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+    def remember(self, key, depth, score, bound, best_move):
+        combined_key = key * 256 + depth
+        self.entries.pop(combined_key, None)
+        self.entries[combined_key] = (score, bound, best_move)
+        if len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]  # Evict the oldest entry
+
+    def probe(self, key, depth):
+        # (score, bound, best move) stored for the position at exactly this depth, or None
+        entry = self.entries.get(key * 256 + depth)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, key, depth, score, bound=EXACT, best_move=None):
+        self.remember(key, depth, score, bound, best_move)
+        if self.read_only:
+            return
+        self.pending.append(ENTRY.pack(key, depth, bound, -1 if best_move is None else best_move, score))
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with locked(self.filename):
+            with open(self.filename, 'ab') as file:
+                file.write(b''.join(self.pending))
+            # Every miss is appended, including entries since evicted from memory, so a long run would grow
+            # the file without bound
+            if os.path.getsize(self.filename) // ENTRY.size > 2 * self.max_entries:
+                self.compact()
+        self.pending = []
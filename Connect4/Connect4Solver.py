@@ -0,0 +1,262 @@
+import sys
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+class Position:
+    """Compact Connect 4 position stored as two bitboards.
+
+    Each column uses height + 1 bits (the extra bit is a sentinel so shifted
+    alignments never wrap into the next column). `current` holds the stones of
+    the player to move and `mask` holds every stone on the board.
+    """
+    def __init__(self, width=7, height=6):
+        self.width = width
+        self.height = height
+        self.current = 0
+        self.mask = 0
+        self.moves = 0
+        self.bottom_mask = sum(1 << (col * (height + 1)) for col in range(width))
+        self.board_mask = self.bottom_mask * ((1 << height) - 1)
+
+    @classmethod
+    def from_board(cls, board, player):
+        # board is the game's list of rows (top row first) holding 'X', 'O' or '-'
+        height, width = len(board), len(board[0])
+        position = cls(width, height)
+        for row in range(height):
+            for col in range(width):
+                cell = board[row][col]
+                if cell == '-':
+                    continue
+                bit = 1 << (col * (height + 1) + (height - 1 - row))
+                position.mask |= bit
+                position.moves += 1
+                if cell == player:
+                    position.current |= bit
+        return position
+
+    @classmethod
+    def from_moves(cls, moves, width=7, height=6):
+        # moves is a sequence of 0-based column numbers, e.g. "3342", as everywhere else in the Connect4 tools
+        position = cls(width, height)
+        for move in moves:
+            col = int(move)
+            if not 0 <= col < width or not position.can_play(col) or position.is_winning_move(col):
+                raise ValueError(f"Invalid move sequence at column {move}")
+            position.play_col(col)
+        return position
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.__dict__.update(self.__dict__)
+        return position
+
+    def key(self):
+        # current + mask is unique per position since the bottom free cell of each column is set
+        return self.current + self.mask
+
+    def mirror_key(self):
+        # key() of the position reflected left to right
+        column_bits = self.height + 1
+        column = (1 << column_bits) - 1
+        key, mirrored = self.key(), 0
+        for col in range(self.width):
+            mirrored |= ((key >> (col * column_bits)) & column) << ((self.width - 1 - col) * column_bits)
+        return mirrored
+
+    def canonical_key(self):
+        # Same key for a position and its mirror image, which always have the same score
+        return min(self.key(), self.mirror_key())
+
+    def top_mask_col(self, col):
+        return 1 << (self.height - 1 + col * (self.height + 1))
+
+    def bottom_mask_col(self, col):
+        return 1 << (col * (self.height + 1))
+
+    def column_mask(self, col):
+        return ((1 << self.height) - 1) << (col * (self.height + 1))
+
+    def can_play(self, col):
+        return (self.mask & self.top_mask_col(col)) == 0
+
+    def play(self, move):
+        # move is a single bit; switching `current` to the opponent's stones changes sides
+        self.current ^= self.mask
+        self.mask |= move
+        self.moves += 1
+
+    def play_col(self, col):
+        self.play((self.mask + self.bottom_mask_col(col)) & self.column_mask(col))
+
+    def possible(self):
+        return (self.mask + self.bottom_mask) & self.board_mask
+
+    def is_winning_move(self, col):
+        return (self.winning_position() & self.possible() & self.column_mask(col)) != 0
+
+    def can_win_next(self):
+        return (self.winning_position() & self.possible()) != 0
+
+    def winning_position(self):
+        return self.compute_winning_position(self.current, self.mask)
+
+    def opponent_winning_position(self):
+        return self.compute_winning_position(self.current ^ self.mask, self.mask)
+
+    def possible_non_losing_moves(self):
+        # Assumes the player to move cannot win immediately
+        possible_mask = self.possible()
+        opponent_win = self.opponent_winning_position()
+        forced_moves = possible_mask & opponent_win
+        if forced_moves:
+            if forced_moves & (forced_moves - 1):
+                return 0  # Two threats at once cannot both be blocked
+            possible_mask = forced_moves
+        return possible_mask & ~(opponent_win >> 1)  # Never play directly below an opponent threat
+
+    def move_score(self, move):
+        # Number of threats the move creates, used for move ordering
+        return popcount(self.compute_winning_position(self.current | move, self.mask))
+
+    def compute_winning_position(self, position, mask):
+        # Empty cells that would complete four in a row for the stones in `position`
+        h = self.height
+        # Vertical
+        r = (position << 1) & (position << 2) & (position << 3)
+        # Horizontal, then the two diagonals
+        for shift in (h + 1, h, h + 2):
+            p = (position << shift) & (position << 2 * shift)
+            r |= p & (position << 3 * shift)
+            r |= p & (position >> shift)
+            p = (position >> shift) & (position >> 2 * shift)
+            r |= p & (position << shift)
+            r |= p & (position >> 3 * shift)
+        return r & (self.board_mask ^ mask)
+
+
+class Solver:
+    """Exact win/draw/loss solver.
+
+    Scores follow the usual convention: positive if the player to move wins,
+    negative if they lose and 0 for a draw. The magnitude is the number of
+    stones the winner still has left to play, so faster wins score higher.
+    """
+    def __init__(self, max_entries=2000000):
+        self.transposition_table = {}  # key -> (score bound, is_lower_bound)
+        self.max_entries = max_entries
+        self.nodes = 0
+
+    def reset(self):
+        self.transposition_table = {}
+        self.nodes = 0
+
+    def ordered_moves(self, position, possible_mask):
+        # Center columns first, then sort (stably) by the number of threats each move creates
+        center = position.width // 2
+        columns = sorted(range(position.width), key=lambda col: abs(col - center))
+        moves = []
+        for col in columns:
+            move = possible_mask & position.column_mask(col)
+            if move:
+                moves.append((position.move_score(move), move))
+        moves.sort(key=lambda scored_move: -scored_move[0])
+        return [move for _, move in moves]
+
+    def negamax(self, position, alpha, beta):
+        self.nodes += 1
+        cells = position.width * position.height
+        possible_mask = position.possible_non_losing_moves()
+        if possible_mask == 0:
+            return -((cells - position.moves) // 2)  # Every move lets the opponent win next
+        if position.moves >= cells - 2:
+            return 0  # Neither side can win with the last two stones
+
+        lower = -((cells - 2 - position.moves) // 2)  # We cannot lose before the opponent's next move
+        if alpha < lower:
+            alpha = lower
+            if alpha >= beta:
+                return alpha
+        upper = (cells - 1 - position.moves) // 2  # We cannot win with our next stone
+        key = position.key()
+        entry = self.transposition_table.get(key)
+        if entry is not None:
+            bound, is_lower = entry
+            if is_lower:
+                if alpha < bound:
+                    alpha = bound
+                    if alpha >= beta:
+                        return alpha
+            elif bound < upper:
+                upper = bound
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+
+        if len(self.transposition_table) >= self.max_entries:
+            self.transposition_table.clear()
+        for move in self.ordered_moves(position, possible_mask):
+            child = position.copy()
+            child.play(move)
+            score = -self.negamax(child, -beta, -alpha)
+            if score >= beta:
+                self.transposition_table[key] = (score, True)
+                return score
+            if score > alpha:
+                alpha = score
+        self.transposition_table[key] = (alpha, False)
+        return alpha
+
+    def solve(self, position, weak=False):
+        # Narrow [lower, upper] with null-window searches until the exact score is known
+        cells = position.width * position.height
+        if position.can_win_next():
+            return (cells + 1 - position.moves) // 2
+        lower = -((cells - position.moves) // 2)
+        upper = (cells + 1 - position.moves) // 2
+        if weak:
+            lower, upper = -1, 1
+        while lower < upper:
+            med = lower + (upper - lower) // 2
+            if med <= 0 and int(lower / 2) < med:
+                med = int(lower / 2)
+            elif med >= 0 and int(upper / 2) > med:
+                med = int(upper / 2)
+            score = self.negamax(position, med, med + 1)
+            if score <= med:
+                upper = score
+            else:
+                lower = score
+        return lower
+
+    def analyze(self, position, weak=False):
+        # Exact score of every column for the player to move (None for full columns)
+        cells = position.width * position.height
+        scores = [None] * position.width
+        for col in range(position.width):
+            if not position.can_play(col):
+                continue
+            if position.is_winning_move(col):
+                scores[col] = (cells + 1 - position.moves) // 2
+            else:
+                child = position.copy()
+                child.play_col(col)
+                scores[col] = -self.solve(child, weak)
+        return scores
+
+
+def main():
+    # Usage: python Connect4Solver.py 3342  (or one move sequence per line on stdin)
+    solver = Solver()
+    sequences = sys.argv[1:] or (line.strip() for line in sys.stdin)
+    for moves in sequences:
+        position = Position.from_moves(moves)
+        print(moves, solver.analyze(position))
+
+
+if __name__ == "__main__":
+    main()
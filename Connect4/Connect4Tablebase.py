@@ -0,0 +1,159 @@
+import glob
+import os
+import random
+import struct
+import sys
+import time
+import numpy as np
+from Connect4Solver import Position
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import CONNECT4_RECORDS, read_game_records
+
+TABLEBASE_FILE = "tablebase_connect4.bin"
+MAGIC = b'C4TB'
+HEADER = struct.Struct('<4sBBBxQ')  # MAGIC | rows | cols | max empty cells | pad | position count (16 bytes)
+WIN_SCORE = 1000000  # Same scale as NegamaxOpponent.WIN_SCORE, far above any evaluate_board score
+
+
+class Tablebase:
+    # Exact scores of endgame positions, in the solver's convention: positive if the player to move wins,
+    # with the number of stones the winner has left as the magnitude. Mirror images share an entry.
+    # File: HEADER, then every canonical key as a sorted u64 array, then the matching i8 scores.
+    def __init__(self, filename=TABLEBASE_FILE):
+        with open(filename, 'rb') as file:
+            magic, self.rows, self.cols, self.max_empty, count = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a tablebase")
+        # Memory-mapped, so several processes share one copy and only the pages probed are read. The header
+        # keeps the key array 8-byte aligned, which binary search needs to run at full speed.
+        self.keys = np.memmap(filename, dtype='<u8', mode='r', offset=HEADER.size, shape=(count,))
+        self.scores = np.memmap(filename, dtype='i1', mode='r', offset=HEADER.size + 8 * count, shape=(count,))
+        self.hits = 0
+
+    def probe(self, position):
+        # Exact score of a Position with the player to move to play, or None if it is not in the table
+        if position.width * position.height - position.moves > self.max_empty:
+            return None
+        key = position.canonical_key()
+        index = int(self.keys.searchsorted(np.uint64(key)))
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        self.hits += 1
+        return int(self.scores[index])
+
+    def fits(self, game):
+        return (game.rows, game.cols, game.win_length) == (self.rows, self.cols, 4)
+
+    def probe_moves(self, game, player):
+        # (score, col) for every playable column if all the resulting positions are known, otherwise None
+        if not self.fits(game):
+            return None
+        position = Position.from_board(game.board, player)
+        cells = position.width * position.height
+        if cells - position.moves > self.max_empty:
+            return None
+        possible_moves = []
+        for col in range(position.width):
+            if not position.can_play(col):
+                continue
+            if position.is_winning_move(col):
+                possible_moves.append(((cells + 1 - position.moves) // 2, col))
+                continue
+            child = position.copy()
+            child.play_col(col)
+            score = self.probe(child)
+            if score is None:
+                return None
+            possible_moves.append((-score, col))
+        return possible_moves
+
+    def evaluate(self, game, board, player):
+        # Exact value of a searched board for `player` on the evaluate_board scale, or None if it isn't known
+        if not self.fits(game):
+            return None
+        x_count = sum(row.count('X') for row in board)
+        o_count = sum(row.count('O') for row in board)
+        if game.rows * game.cols - x_count - o_count > self.max_empty:
+            return None
+        to_move = 'X' if x_count == o_count else 'O'
+        score = self.probe(Position.from_board(board, to_move))
+        if score is None:
+            return None
+        if to_move != player:
+            score = -score
+        return 0 if score == 0 else score + (WIN_SCORE if score > 0 else -WIN_SCORE)
+
+
+def load_tablebase(filename=TABLEBASE_FILE):
+    return Tablebase(filename) if os.path.exists(filename) else None
+
+
+def solve_subtree(position, table):
+    # Exact score of the position and of everything reachable from it, by plain minimax over the whole subtree
+    key = position.canonical_key()
+    score = table.get(key)
+    if score is not None:
+        return score
+    cells = position.width * position.height
+    score = -cells if position.moves < cells else 0
+    for col in range(position.width):
+        if not position.can_play(col):
+            continue
+        if position.is_winning_move(col):
+            score = max(score, (cells + 1 - position.moves) // 2)
+            continue
+        child = position.copy()
+        child.play_col(col)
+        score = max(score, -solve_subtree(child, table))
+    table[key] = score
+    return score
+
+
+def seed_positions(max_empty, record_files, random_games, rows=6, cols=7):
+    # Positions with exactly max_empty empty cells, from recorded games and from random play
+    cells = rows * cols
+    for filename in record_files:
+        for record in read_game_records(filename, CONNECT4_RECORDS):
+            if len(record.moves) <= cells - max_empty:
+                continue  # The game was over before reaching max_empty empty cells
+            position = Position(cols, rows)
+            for col in record.moves[:cells - max_empty]:
+                position.play_col(col)
+            yield position
+    for _ in range(random_games):
+        position = Position(cols, rows)
+        while position.moves < cells - max_empty:
+            cols_left = [col for col in range(cols) if position.can_play(col) and not position.is_winning_move(col)]
+            if not cols_left:
+                position = Position(cols, rows)  # Every move wins or the board filled early; start over
+                continue
+            position.play_col(random.choice(cols_left))
+        yield position
+
+
+def build_tablebase(max_empty=10, record_files=(), random_games=200, rows=6, cols=7, filename=TABLEBASE_FILE):
+    table = {}
+    start = time.time()
+    for seeds, position in enumerate(seed_positions(max_empty, record_files, random_games, rows, cols), 1):
+        solve_subtree(position, table)
+        if seeds % 100 == 0:
+            print(f"{seeds} seed positions, {len(table)} positions solved in {time.time() - start:.1f}s")
+    keys = np.array(sorted(table), dtype='<u8')
+    scores = np.array([table[key] for key in keys.tolist()], dtype='i1')
+    with open(filename, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, rows, cols, max_empty, len(keys)))
+        file.write(keys.tobytes())
+        file.write(scores.tobytes())
+    print(f"Saved {len(keys)} positions with up to {max_empty} empty cells to {filename}")
+
+
+def main():
+    # Usage: python Connect4Tablebase.py [max empty cells] [random games]
+    # Seeds come from every *.c4r game record file in the current folder plus the random games
+    max_empty = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    random_games = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    build_tablebase(max_empty, glob.glob('*.c4r'), random_games)
+
+
+if __name__ == "__main__":
+    main()
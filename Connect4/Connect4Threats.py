@@ -0,0 +1,75 @@
+from Connect4Solver import Position, popcount
+
+
+def columns_of(position, cells):
+    # Columns holding at least one of the cells in the bitmask
+    return [col for col in range(position.width) if cells & position.column_mask(col)]
+
+
+class ThreatAnalysis:
+    # Static tactics of a position for the player to move, read straight off the bitboards.
+    # A threat is an empty cell that would complete four in a row for one side.
+    def __init__(self, position):
+        self.position = position
+        self.possible = position.possible()
+        self.own_threats = position.winning_position()
+        self.opponent_threats = position.opponent_winning_position()
+        self.winning_moves = columns_of(position, self.own_threats & self.possible)
+        self.forced_blocks = columns_of(position, self.opponent_threats & self.possible)
+
+    @classmethod
+    def from_board(cls, game, player):
+        return cls(Position.from_board(game.board, player))
+
+    def is_lost(self):
+        # The opponent has two immediate wins and only one can be blocked
+        return not self.winning_moves and len(self.forced_blocks) >= 2
+
+    def safe_moves(self):
+        # Columns that neither ignore an immediate threat nor let the opponent win directly on top
+        columns = self.forced_blocks or [col for col in range(self.position.width) if self.position.can_play(col)]
+        return [col for col in columns if not self.move_mask(col) << 1 & self.opponent_threats]
+
+    def move_mask(self, col):
+        return self.possible & self.position.column_mask(col)
+
+    def double_threat_moves(self):
+        # Safe moves after which the opponent cannot stop us winning on the next move: two threats they can
+        # reach at once, or two threats on top of each other. Assumes we have no immediate win.
+        moves = []
+        for col in self.safe_moves():
+            move = self.move_mask(col)
+            stones, mask = self.position.current | move, self.position.mask | move
+            threats = self.position.compute_winning_position(stones, mask)
+            playable = threats & ((mask + self.position.bottom_mask) & self.position.board_mask)
+            if popcount(playable) >= 2 or playable & (threats >> 1):
+                moves.append(col)
+        return moves
+
+    def parity_winner(self, position=None):
+        # Allis-style zugzwang rule of thumb for when the board fills up: the first player ('X') can claim odd
+        # rows (counted from 1 at the bottom) and the second player ('O') even rows. Simplified rules:
+        # X wins with an odd threat that has no O threat below it in the same column; otherwise O wins with
+        # an even threat. Returns 'X', 'O' or None.
+        position = position or self.position
+        stones = [position.current, position.current ^ position.mask]  # Player to move first
+        x_stones, o_stones = stones if position.moves % 2 == 0 else stones[::-1]
+        empty = position.board_mask ^ position.mask
+        x_threats = position.compute_winning_position(x_stones, position.mask) & empty
+        o_threats = position.compute_winning_position(o_stones, position.mask) & empty
+        odd_rows = position.bottom_mask * int('01' * ((position.height + 1) // 2), 2) & position.board_mask
+        x_odd = x_threats & odd_rows
+        for col in range(position.width):
+            column = position.column_mask(col)
+            lowest = x_odd & column & -(x_odd & column)  # Lowest odd X threat in the column
+            if lowest and not o_threats & column & (lowest - 1):
+                return 'X'
+        if o_threats & ~odd_rows:
+            return 'O'
+        return None
+
+    def parity_after(self, col):
+        # parity_winner once the player to move plays in `col`
+        child = self.position.copy()
+        child.play_col(col)
+        return self.parity_winner(child)
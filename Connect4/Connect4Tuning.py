@@ -0,0 +1,178 @@
+import glob
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+from Connect4Game import Connect4Game, DEFAULT_WEIGHTS, WEIGHTS_FILE, load_evaluation_weights
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import CONNECT4_RECORDS, read_game_records
+
+# evaluate_board is linear in its weights: score = sum(weight * feature count), with the features below
+FEATURES = ("center", "three", "opponent_three", "two", "opponent_two")
+RESULT_LABELS = {'X': 1.0, 'O': 0.0, 'Draw': 0.5}  # Game result from X's point of view
+
+
+def window_cells(rows=6, cols=7):
+    # The windows score_position looks at around each empty cell, as flat cell indices: (empty cell, 4 cells)
+    cells, windows = [], []
+    for row in range(rows):
+        for col in range(cols):
+            lines = [[(row, c + i) for i in range(4)] for c in range(max(0, col - 3), min(cols - 3, col + 1))]
+            if row <= rows - 4:
+                lines.append([(row + i, col) for i in range(4)])
+            if row <= rows - 4 and col <= cols - 4:
+                lines.append([(row + i, col + i) for i in range(4)])
+            if row >= 3 and col <= cols - 4:
+                lines.append([(row - i, col + i) for i in range(4)])
+            for line in lines:
+                cells.append(row * cols + col)
+                windows.append([r * cols + c for r, c in line])
+    return np.array(cells), np.array(windows)
+
+
+def board_array(board):
+    # +1 for X, -1 for O, 0 for empty, flattened row by row
+    return np.array([[1 if cell == 'X' else -1 if cell == 'O' else 0 for cell in row] for row in board], dtype=np.int8).ravel()
+
+
+def window_counts(own, opp, empty):
+    # evaluate_window's four patterns, with its if/elif precedence
+    three = (own == 3) & (empty == 1)
+    opponent_three = ~three & (opp == 3) & (empty == 1)
+    two = (own == 2) & (empty == 2)
+    opponent_two = ~two & (opp == 2) & (empty == 2)
+    return np.stack([three, opponent_three, two, opponent_two], axis=-1)
+
+
+def extract_features(boards, rows=6, cols=7):
+    # Feature counts of evaluate_board(board, 'X') for an (N, rows * cols) array of board_array boards,
+    # so that evaluate_board(board, 'X') == features @ weights
+    cells, windows = window_cells(rows, cols)
+    features = np.zeros((len(boards), len(FEATURES)))
+    features[:, 0] = (boards.reshape(len(boards), rows, cols)[:, :, cols // 2] == 1).sum(axis=1)
+    for start in range(0, len(boards), 4096):  # Chunks keep the (N, windows, 4) array small
+        chunk = boards[start:start + 4096]
+        values = chunk[:, windows]
+        x_count, o_count = (values == 1).sum(axis=2), (values == -1).sum(axis=2)
+        empty_count = (values == 0).sum(axis=2) - 1  # Less the empty cell the piece is placed in
+        is_empty = (chunk[:, cells] == 0)[:, :, None]
+        # score_position(X) minus score_position(O) over every empty cell
+        counts = (window_counts(x_count + 1, o_count, empty_count).astype(int)
+                  - window_counts(o_count + 1, x_count, empty_count)) * is_empty
+        features[start:start + len(chunk), 1:] = counts.sum(axis=1)
+    return features
+
+
+def load_positions(record_files, rows=6, cols=7, skip_plies=4):
+    # Every position of every recorded game after the opening, labelled with the game's result. Each is
+    # used from both sides: as is for X, and with the colours swapped for O with the label flipped.
+    boards, labels = [], []
+    for filename in record_files:
+        for record in read_game_records(filename, CONNECT4_RECORDS):
+            board = np.zeros(rows * cols, dtype=np.int8)
+            heights = [rows - 1] * cols
+            for ply, col in enumerate(record.moves):
+                board[heights[col] * cols + col] = 1 if ply % 2 == 0 else -1
+                heights[col] -= 1
+                if ply + 1 >= skip_plies and ply + 1 < len(record.moves):
+                    boards.append(board.copy())
+                    labels.append(RESULT_LABELS[record.winner])
+    boards, labels = np.array(boards, dtype=np.int8).reshape(-1, rows * cols), np.array(labels)
+    return np.concatenate([boards, -boards]), np.concatenate([labels, 1 - labels])
+
+
+def self_play_records(games, filename, random_plies=6):
+    # A corpus for when no records exist yet: Default Opponent self-play after a few random moves
+    from Connect4Opponents import DefaultOpponent
+    from GameRecords import GameRecordWriter
+    game = Connect4Game()
+    opponent = DefaultOpponent()
+    writer = GameRecordWriter(filename, CONNECT4_RECORDS, resume=False)
+    for _ in range(games):
+        game.reset_board()
+        winner = None
+        while winner is None:
+            if len(game.moves) < random_plies:
+                col = random.choice([col for col in range(game.cols) if game.board[0][col] == '-'])
+            else:
+                col = opponent.choose_move(game, game.turn)
+            game.drop_piece(col)
+            if game.check_win():
+                winner = game.turn
+            elif game.is_full():
+                winner = 'Draw'
+            else:
+                game.change_turn()
+        writer.write('Default Opponent', 'Default Opponent', 0, winner, game.moves)
+    writer.close()
+
+
+def logistic_loss(features, labels, weights, scale):
+    p = 1 / (1 + np.exp(-np.clip(scale * features @ weights, -50, 50)))
+    p = np.clip(p, 1e-9, 1 - 1e-9)
+    return -np.mean(labels * np.log(p) + (1 - labels) * np.log(1 - p))
+
+
+def fit_scale(features, labels, weights):
+    # Texel's K: the sigmoid scale that best maps the current weights' scores to results, found once and then
+    # held fixed so the tuned weights stay on the same scale as the hand-picked ones
+    scales = np.logspace(-5, -1, 81)
+    return scales[np.argmin([logistic_loss(features, labels, weights, scale) for scale in scales])]
+
+
+def fit_weights(features, labels, weights, scale, steps=500, learning_rate=0.5):
+    # Gradient descent on the logistic loss, in units of each feature's spread so one step size suits them all
+    spread = features.std(axis=0)
+    active = spread > 0  # Features that never vary carry no signal and keep their weight
+    spread[~active] = 1
+    scaled = features / spread
+    params = weights * spread
+    for _ in range(steps):
+        p = 1 / (1 + np.exp(-np.clip(scale * scaled @ params, -50, 50)))
+        gradient = scaled.T @ (p - labels) / len(labels)  # With respect to scale * params
+        params -= learning_rate / scale * gradient * active
+    return params / spread, active
+
+
+def tune(record_files, filename=WEIGHTS_FILE):
+    start = time.time()
+    boards, labels = load_positions(record_files)
+    if not len(boards):
+        print("No positions to tune on")
+        return None
+    features = extract_features(boards)
+    print(f"{len(boards)} positions and their features in {time.time() - start:.1f}s")
+    current = load_evaluation_weights()
+    weights = np.array([current[name] for name in FEATURES], dtype=float)
+    start = time.time()
+    scale = fit_scale(features, labels, weights)
+    before = logistic_loss(features, labels, weights, scale)
+    weights, active = fit_weights(features, labels, weights, scale)
+    # The searches compare scores with integer windows, so the weights stay whole numbers
+    tuned = {name: int(round(weight)) for name, weight in zip(FEATURES, weights)}
+    after = logistic_loss(features, labels, np.array([tuned[name] for name in FEATURES], dtype=float), scale)
+    print(f"Fitted in {time.time() - start:.1f}s (K={scale:.2e}): loss {before:.4f} -> {after:.4f}")
+    for name, is_active in zip(FEATURES, active):
+        note = "" if is_active else "  (never occurs, unchanged)"
+        print(f"  {name}: {current[name]} -> {tuned[name]}{note}")
+    with open(filename, 'w') as file:
+        json.dump(tuned, file, indent=2)
+    print(f"Saved to {filename}; delete it to go back to the defaults {DEFAULT_WEIGHTS}")
+    return tuned
+
+
+def main():
+    # Usage: python Connect4Tuning.py [record files...]
+    # Defaults to every *.c4r file in the current folder, or 2000 self-play games if there are none
+    record_files = sys.argv[1:] or glob.glob('*.c4r')
+    if not record_files:
+        print("No game records found, playing 2000 self-play games first")
+        self_play_records(2000, "tuning_games_connect4.c4r")
+        record_files = ["tuning_games_connect4.c4r"]
+    tune(record_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import tkinter as tk
+from tkinter import messagebox, ttk
+from MNKEngine import MNKBoard, MNKSearch, PLAYERS
+
+
+class MNKGUI:
+    def __init__(self, master):
+        self.master = master
+        self.master.title("m,n,k Game")
+        self.player_options = ('Human', 'Computer')
+        self.board_presets = {
+            'Connect 4 (6x7, k=4, gravity)': (6, 7, 4, True),
+            'Connect 4 (7x8, k=4, gravity)': (7, 8, 4, True),
+            'Tic Tac Toe (3x3, k=3)': (3, 3, 3, False),
+            'Gomoku (9x9, k=5)': (9, 9, 5, False),
+            'Gomoku (15x15, k=5)': (15, 15, 5, False),
+        }
+        self.canvas_size = 450
+        self.initialize_options()
+        self.canvas = tk.Canvas(master, width=self.canvas_size, height=self.canvas_size, bg='grey')
+        self.canvas.grid(row=3, column=0, columnspan=4, pady=0)
+        self.canvas.bind("<Button-1>", self.handle_click)
+        self.initialize_game()
+
+    def initialize_options(self):
+        ttk.Label(self.master, text="Board:").grid(column=0, row=0, padx=10, pady=10)
+        self.board_type = ttk.Combobox(self.master, width=30, values=list(self.board_presets), state="readonly")
+        self.board_type.grid(column=1, row=0, columnspan=2)
+        self.board_type.set('Connect 4 (6x7, k=4, gravity)')
+
+        ttk.Label(self.master, text="Search depth:").grid(column=3, row=0, padx=10)
+        self.depth = tk.Spinbox(self.master, from_=1, to=8, width=4)
+        self.depth.grid(column=4, row=0)
+        self.depth.delete(0, 'end')
+        self.depth.insert(0, '4')
+
+        ttk.Label(self.master, text="Player X:").grid(column=0, row=1, padx=10, pady=10)
+        self.player1_type = ttk.Combobox(self.master, width=12, values=self.player_options, state="readonly")
+        self.player1_type.grid(column=1, row=1)
+        self.player1_type.set('Human')
+
+        ttk.Label(self.master, text="Player O:").grid(column=2, row=1, padx=10, pady=10)
+        self.player2_type = ttk.Combobox(self.master, width=12, values=self.player_options, state="readonly")
+        self.player2_type.grid(column=3, row=1)
+        self.player2_type.set('Computer')
+
+        play_button = ttk.Button(self.master, text="Start Game", command=self.initialize_game)
+        play_button.grid(column=0, row=2, columnspan=2, pady=10)
+
+    def initialize_game(self):
+        rows, cols, k, gravity = self.board_presets[self.board_type.get()]
+        self.board = MNKBoard(rows, cols, k, gravity)
+        self.cell_size = self.canvas_size / max(rows, cols)
+        self.game_over = False
+        self.draw_board()
+        self.ai_move()
+
+    def draw_board(self):
+        self.canvas.delete('all')
+        for row in range(self.board.rows):
+            for col in range(self.board.cols):
+                x1, y1 = col * self.cell_size, row * self.cell_size
+                self.canvas.create_rectangle(x1, y1, x1 + self.cell_size, y1 + self.cell_size, fill='grey', outline='white')
+        for player, stones in zip(PLAYERS, self.board.stones):
+            for cell in range(self.board.rows * self.board.cols):
+                if stones >> cell & 1:
+                    self.draw_piece(cell, player)
+
+    def draw_piece(self, cell, player):
+        row, col = divmod(cell, self.board.cols)
+        x1 = col * self.cell_size + self.cell_size / 6
+        y1 = row * self.cell_size + self.cell_size / 6
+        color = 'red' if player == 'X' else 'yellow'
+        self.canvas.create_oval(x1, y1, x1 + self.cell_size * 2 / 3, y1 + self.cell_size * 2 / 3, fill=color, outline='white')
+
+    def is_computer_turn(self):
+        player_type = self.player1_type if self.board.to_move == 0 else self.player2_type
+        return player_type.get() == 'Computer'
+
+    def handle_click(self, event):
+        if self.game_over or self.is_computer_turn():
+            return
+        row, col = int(event.y // self.cell_size), int(event.x // self.cell_size)
+        if not (0 <= row < self.board.rows and 0 <= col < self.board.cols):
+            return
+        legal_moves = self.board.legal_moves()
+        # With gravity a click anywhere in a column drops into it
+        cell = next((cell for cell in legal_moves if cell % self.board.cols == col), None) if self.board.gravity \
+            else self.board.cell(row, col)
+        if cell in legal_moves:
+            self.play(cell)
+
+    def play(self, cell):
+        player = PLAYERS[self.board.to_move]
+        won = self.board.play(cell)
+        self.draw_piece(cell, player)
+        if won:
+            self.game_over = True
+            messagebox.showinfo("Game Over", f"Player {player} wins!")
+        elif self.board.is_full():
+            self.game_over = True
+            messagebox.showinfo("Game Over", "Game is a draw!")
+        else:
+            self.ai_move()
+
+    def ai_move(self):
+        if not self.game_over and self.is_computer_turn():
+            self.master.after(100, lambda: self.play(MNKSearch(int(self.depth.get())).choose_move(self.board)))
+
+
+def main():
+    root = tk.Tk()
+    MNKGUI(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import random
+from functools import lru_cache
+
+PLAYERS = ('X', 'O')
+
+
+class LineTable:
+    # Every winning line of a rows x cols board with k in a row, precomputed once per board shape
+    def __init__(self, rows, cols, k):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.masks = []  # Bitmask of the k cells of each line, cells indexed row * cols + col
+        self.lines_through = [[] for _ in range(rows * cols)]  # Line indices passing through each cell
+        for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):  # Horizontal, vertical, both diagonals
+            for row in range(rows):
+                for col in range(cols):
+                    end_row, end_col = row + d_row * (k - 1), col + d_col * (k - 1)
+                    if not (0 <= end_row < rows and 0 <= end_col < cols):
+                        continue
+                    cells = [(row + d_row * i) * cols + (col + d_col * i) for i in range(k)]
+                    for cell in cells:
+                        self.lines_through[cell].append(len(self.masks))
+                    self.masks.append(sum(1 << cell for cell in cells))
+        # Bitmask of the (up to eight) cells around each cell
+        self.neighbors = [0] * (rows * cols)
+        for row in range(rows):
+            for col in range(cols):
+                for d_row in (-1, 0, 1):
+                    for d_col in (-1, 0, 1):
+                        r, c = row + d_row, col + d_col
+                        if (d_row or d_col) and 0 <= r < rows and 0 <= c < cols:
+                            self.neighbors[row * cols + col] |= 1 << (r * cols + c)
+        # Window weights: a line holding n stones of one player and none of the other is worth 4 ** n
+        self.weights = [0] + [4 ** n for n in range(1, k)] + [0]
+
+    def contribution(self, x_count, o_count):
+        # Value of one line from X's point of view; mixed lines can never be won and are worth nothing
+        if o_count == 0:
+            return self.weights[x_count]
+        if x_count == 0:
+            return -self.weights[o_count]
+        return 0
+
+
+@lru_cache(maxsize=None)
+def get_line_table(rows, cols, k):
+    return LineTable(rows, cols, k)
+
+
+class MNKBoard:
+    # Board for any (rows, cols, k), with or without gravity. Player 0 is 'X' and moves first.
+    def __init__(self, rows=6, cols=7, k=4, gravity=True):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.gravity = gravity
+        self.lines = get_line_table(rows, cols, k)
+        self.stones = [0, 0]  # Bitmask of each player's stones
+        self.counts = [[0] * len(self.lines.masks) for _ in PLAYERS]  # Stones per line and player
+        self.heights = [rows - 1] * cols  # Next free row in each column, used with gravity
+        self.score = 0  # Sum of every line's contribution, kept up to date by play and undo
+        self.to_move = 0
+        self.history = []
+        self.winner = None
+
+    def cell(self, row, col):
+        return row * self.cols + col
+
+    def is_full(self):
+        return len(self.history) == self.rows * self.cols
+
+    def legal_moves(self):
+        if self.gravity:
+            return [self.cell(self.heights[col], col) for col in range(self.cols) if self.heights[col] >= 0]
+        occupied = self.stones[0] | self.stones[1]
+        return [cell for cell in range(self.rows * self.cols) if not occupied >> cell & 1]
+
+    def candidate_moves(self):
+        # Without gravity, large boards only consider cells next to existing stones
+        if self.gravity or not self.history:
+            moves = self.legal_moves()
+        else:
+            occupied = self.stones[0] | self.stones[1]
+            moves = [cell for cell in range(self.rows * self.cols)
+                     if not occupied >> cell & 1 and occupied & self.lines.neighbors[cell]]
+        center_row, center_col = (self.rows - 1) / 2, (self.cols - 1) / 2
+        return sorted(moves, key=lambda cell: abs(cell // self.cols - center_row) + abs(cell % self.cols - center_col))
+
+    def play(self, cell):
+        player = self.to_move
+        if self.gravity:
+            self.heights[cell % self.cols] -= 1
+        self.stones[player] |= 1 << cell
+        own, other = self.counts[player], self.counts[1 - player]
+        won = False
+        # Only the lines through the new stone change, so this costs O(k) whatever the board size
+        for line in self.lines.lines_through[cell]:
+            x_count, o_count = (own[line], other[line]) if player == 0 else (other[line], own[line])
+            self.score -= self.lines.contribution(x_count, o_count)
+            own[line] += 1
+            if own[line] == self.k:
+                won = True
+            x_count, o_count = (own[line], other[line]) if player == 0 else (other[line], own[line])
+            self.score += self.lines.contribution(x_count, o_count)
+        self.history.append((cell, self.winner))
+        if won:
+            self.winner = PLAYERS[player]
+        self.to_move = 1 - player
+        return won
+
+    def undo(self):
+        cell, self.winner = self.history.pop()
+        self.to_move = player = 1 - self.to_move
+        if self.gravity:
+            self.heights[cell % self.cols] += 1
+        self.stones[player] &= ~(1 << cell)
+        own, other = self.counts[player], self.counts[1 - player]
+        for line in self.lines.lines_through[cell]:
+            x_count, o_count = (own[line], other[line]) if player == 0 else (other[line], own[line])
+            self.score -= self.lines.contribution(x_count, o_count)
+            own[line] -= 1
+            x_count, o_count = (own[line], other[line]) if player == 0 else (other[line], own[line])
+            self.score += self.lines.contribution(x_count, o_count)
+
+    def check_win(self, player):
+        # Bitmask line test over the whole board, for positions not built with play()
+        stones = self.stones[PLAYERS.index(player)]
+        return any(stones & mask == mask for mask in self.lines.masks)
+
+    def evaluate(self):
+        # Window-count score from the point of view of the player to move
+        return self.score if self.to_move == 0 else -self.score
+
+
+class MNKSearch:
+    WIN_SCORE = 10 ** 9
+
+    def __init__(self, depth=3):
+        self.depth = depth
+        self.nodes = 0
+
+    def negamax(self, board, depth, alpha, beta):
+        self.nodes += 1
+        if board.winner is not None:
+            return -(self.WIN_SCORE + depth)  # The previous mover won; prefer slower losses
+        if depth == 0 or board.is_full():
+            return board.evaluate()
+        best = -self.WIN_SCORE * 2
+        for cell in board.candidate_moves():
+            board.play(cell)
+            score = -self.negamax(board, depth - 1, -beta, -alpha)
+            board.undo()
+            if score > best:
+                best = score
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best
+
+    def choose_move(self, board):
+        best_score, possible_moves = None, []
+        alpha, beta = -self.WIN_SCORE * 2, self.WIN_SCORE * 2
+        for cell in board.candidate_moves():
+            board.play(cell)
+            # Searching just below the best score keeps ties exact for the random tie-break
+            score = -self.negamax(board, self.depth - 1, -beta, -(alpha - 1))
+            board.undo()
+            if best_score is None or score > best_score:
+                best_score, possible_moves = score, [cell]
+            elif score == best_score:
+                possible_moves.append(cell)
+            alpha = max(alpha, score)
+        return random.choice(possible_moves)
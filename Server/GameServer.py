@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAME_DIRS = {'connect4': os.path.join(ROOT, 'Connect4'), 'tictactoe': os.path.join(ROOT, 'TicTacToe')}
+for game_dir in GAME_DIRS.values():
+    sys.path.insert(0, game_dir)
+
+from Connect4Game import Connect4Game
+from TicTacToeGame import TicTacToe
+
+ENGINES = {
+    'connect4': ('minimax', 'alpha-beta', 'negamax', 'mcts', 'default', 'q-learning'),
+    'tictactoe': ('minimax', 'alpha-beta', 'mcts', 'default', 'q-learning'),
+}
+FALLBACK_ENGINE = 'default'  # Plays the rest of a session's moves once its time budget is spent
+
+engines = {}  # (game, engine) -> opponent, built once per process and shared by every session it serves;
+# nothing carries over from one request to the next
+
+
+def load_engines():
+    # Built from inside each game folder, where the Q-tables, opening book, tablebase and search caches live.
+    # With the default fork start method the pool processes inherit the server's copies instead of reloading.
+    # The search caches are read-only here: the pool processes would otherwise each append to the same files
+    # and lose whatever was still pending when the pool shuts down.
+    if engines:
+        return
+    import Connect4Opponents as connect4
+    import TicTacToeOpponents as tictactoe
+    from Connect4OpeningBook import load_opening_book
+    from Connect4SearchCache import SearchCache, search_cache_filename
+    from Connect4Tablebase import load_tablebase
+    cwd = os.getcwd()
+    try:
+        os.chdir(GAME_DIRS['connect4'])
+        connect4.Opponent.opening_book = load_opening_book()
+        connect4.Opponent.tablebase = load_tablebase()
+        engines.update({
+            ('connect4', 'minimax'): connect4.MinimaxOpponent(),
+            ('connect4', 'alpha-beta'): connect4.AlphaBetaOpponent(),
+            ('connect4', 'negamax'): connect4.NegamaxOpponent(),
+            ('connect4', 'mcts'): connect4.MCTSOpponent(),
+            ('connect4', 'default'): connect4.DefaultOpponent(),
+            ('connect4', 'q-learning'): connect4.QLearningOpponent(),
+        })
+        search_caches = {}
+        for engine in engines.values():
+            name = engine.search_cache_name
+            if name is not None:
+                if name not in search_caches:
+                    filename = os.path.join(GAME_DIRS['connect4'], search_cache_filename(name, Connect4Game()))
+                    search_caches[name] = SearchCache(filename, read_only=True)
+                engine.search_cache = search_caches[name]
+        os.chdir(GAME_DIRS['tictactoe'])
+        engines.update({
+            ('tictactoe', 'minimax'): tictactoe.MinimaxOpponent(),
+            ('tictactoe', 'alpha-beta'): tictactoe.MinimaxWithAlphaBetaOpponent(),
+            ('tictactoe', 'mcts'): tictactoe.MCTSOpponent(),
+            ('tictactoe', 'default'): tictactoe.DefaultOpponent(),
+            ('tictactoe', 'q-learning'): tictactoe.QLearningOpponent(),
+        })
+    finally:
+        os.chdir(cwd)
+
+
+def engine_move(game_name, engine_name, board, player, time_limit):
+    # Runs in a pool process; returns the engine's move (column or cell index) and its thinking time
+    load_engines()
+    engine = engines[(game_name, engine_name)]
+    if hasattr(engine, 'time_limit'):
+        engine.time_limit = time_limit
+    if hasattr(engine, 'root'):
+        engine.root = None  # An MCTS tree from the previous request may belong to another session's game
+    start = time.time()
+    if game_name == 'connect4':
+        game = Connect4Game()
+        game.board, game.turn = board, player
+        move = engine.choose_move(game, player)
+    else:
+        game = TicTacToe(None, None)
+        game.board, game.current_player = board, player
+        row, col = engine.choose_move(game)
+        move = row * 3 + col
+    return (None if move is None else int(move)), time.time() - start  # Some engines return NumPy integers
+
+
+class Session:
+    def __init__(self, session_id, game_name, engine_name, engine_player, time_budget):
+        self.id = session_id
+        self.game_name = game_name
+        self.engine_name = engine_name
+        self.engine_player = engine_player
+        self.time_budget = time_budget  # Seconds of engine thinking time for the whole game
+        self.time_used = 0.0
+        self.winner = None
+        if game_name == 'connect4':
+            self.game = Connect4Game()
+        else:
+            self.game = TicTacToe(None, None)
+
+    @property
+    def turn(self):
+        return self.game.turn if self.game_name == 'connect4' else self.game.current_player
+
+    def empty_cells(self):
+        return sum(row.count('-' if self.game_name == 'connect4' else ' ') for row in self.game.board)
+
+    def legal_moves(self):
+        if self.game_name == 'connect4':
+            return [col for col in range(self.game.cols) if self.game.board[0][col] == '-']
+        return [row * 3 + col for row, col in self.game.get_empty_cells()]
+
+    def play(self, move):
+        # Plays a legal move for the side to move and updates the winner ('X', 'O', 'Draw' or None)
+        player = self.turn
+        if self.game_name == 'connect4':
+            self.game.drop_piece(move)
+            if self.game.check_win():
+                self.winner = player
+            elif self.game.is_full():
+                self.winner = 'Draw'
+            else:
+                self.game.change_turn()
+        else:
+            self.game.make_move(*divmod(move, 3), player)
+            if self.game.check_win(player):
+                self.winner = player
+            elif self.game.check_draw():
+                self.winner = 'Draw'
+            else:
+                self.game.switch_player()
+
+    def state(self):
+        return {"session": self.id, "board": [''.join(row) for row in self.game.board], "turn": self.turn,
+                "winner": self.winner, "time_left": round(self.time_budget - self.time_used, 3)}
+
+
+class GameServer:
+    def __init__(self, workers=None, max_queue=1000, latency_window=10000):
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.workers = workers or os.cpu_count() or 1
+        self.in_flight = asyncio.Semaphore(self.workers * 2)  # Keeps at most two moves per worker submitted
+        self.max_queue = max_queue  # Move requests beyond this are refused rather than queued
+        self.queue_depth = 0  # Engine moves waiting for or running in the pool
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.latencies = deque(maxlen=latency_window)  # Seconds from request to engine reply, queueing included
+        self.think_times = deque(maxlen=latency_window)  # Seconds the engine itself spent
+        self.moves_served = 0
+
+    def is_busy(self):
+        return self.queue_depth >= self.max_queue
+
+    async def engine_turn(self, session):
+        self.queue_depth += 1
+        start = time.time()
+        try:
+            async with self.in_flight:
+                remaining = session.time_budget - session.time_used
+                engine_name = session.engine_name if remaining > 0 else FALLBACK_ENGINE
+                # Spread what is left of the budget over the engine's remaining moves
+                time_limit = max(remaining, 0.01) / max(1, session.empty_cells() // 2)
+                board = [row[:] for row in session.game.board]
+                move, think_time = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, engine_move, session.game_name, engine_name, board, session.turn, time_limit)
+        finally:
+            self.queue_depth -= 1
+        if move not in session.legal_moves():
+            move = session.legal_moves()[0]  # An engine with no opinion (e.g. None) still has to move
+        session.time_used += think_time
+        self.latencies.append(time.time() - start)
+        self.think_times.append(think_time)
+        self.moves_served += 1
+        session.play(move)
+        return move
+
+    async def handle(self, request):
+        op = request.get("op")
+        if op in ("new", "move") and self.is_busy():
+            return {"error": "server busy"}  # Checked first, so a refused move leaves the session unchanged
+        if op == "new":
+            game_name = request.get("game", "connect4")
+            engine_name = request.get("engine", "default")
+            if engine_name not in ENGINES.get(game_name, ()):
+                return {"error": f"unknown game or engine {game_name}/{engine_name}"}
+            engine_player = request.get("engine_player", 'O')
+            if engine_player not in ('X', 'O'):
+                return {"error": "engine_player must be 'X' or 'O'"}
+            session = Session(next(self.session_ids), game_name, engine_name, engine_player,
+                              float(request.get("time_budget", 30)))
+            self.sessions[session.id] = session
+            reply = {"engine_move": await self.engine_turn(session)} if session.engine_player == 'X' else {}
+            return {**reply, **session.state()}
+        if op == "move":
+            session = self.sessions.get(int_field(request, "session"))
+            if session is None:
+                return {"error": "unknown session"}
+            if session.winner is not None or session.turn == session.engine_player:
+                return {"error": "not your turn", **session.state()}
+            move = int_field(request, "move")
+            if move not in session.legal_moves():
+                return {"error": "illegal move", **session.state()}
+            session.play(move)
+            reply = {"engine_move": await self.engine_turn(session)} if session.winner is None else {}
+            return {**reply, **session.state()}
+        if op == "close":
+            self.sessions.pop(int_field(request, "session"), None)
+            return {"ok": True}
+        if op == "stats":
+            return self.stats()
+        return {"error": f"unknown op {op}"}
+
+    def stats(self):
+        return {"sessions": len(self.sessions), "queue_depth": self.queue_depth, "workers": self.workers,
+                "moves": self.moves_served, "latency_ms": percentiles(self.latencies),
+                "think_ms": percentiles(self.think_times)}
+
+    async def serve_client(self, reader, writer):
+        # One request per line; a connection's requests are answered in order, so a client that waits for
+        # its replies is slowed down by a busy pool rather than piling up work
+        sessions = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    reply = await self.handle(request)
+                    if "session" in reply:
+                        sessions.add(reply["session"])
+                except Exception as error:  # A bad request gets an error reply instead of closing the connection
+                    reply = {"error": str(error) or error.__class__.__name__}
+                writer.write((json.dumps(reply) + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session_id in sessions:
+                self.sessions.pop(session_id, None)  # Sessions end with their connection
+            writer.close()
+
+    async def report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(json.dumps(self.stats()), flush=True)
+
+
+def int_field(request, name):
+    # JSON numbers like 3.0 and true would otherwise slip through as moves or session ids
+    value = request.get(name)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"{name} must be an integer")
+    return value
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {f"p{p}": round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000, 2) for p in (50, 90, 99)}
+
+
+async def run_server(args):
+    load_engines()  # Before the pool forks, so its processes start with every engine already loaded
+    server = GameServer(args.workers, args.max_queue)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.serve_client, path=args.unix, backlog=1024)
+    else:
+        listener = await asyncio.start_server(server.serve_client, args.host, args.port, backlog=1024)
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'} with {server.workers} engine processes", flush=True)
+    if args.report:
+        asyncio.get_running_loop().create_task(server.report(args.report))
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line-delimited JSON server for Connect4 and TicTacToe games")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Unix socket path to listen on instead of TCP")
+    parser.add_argument('--workers', type=int, help="Engine processes (default: one per CPU)")
+    parser.add_argument('--max-queue', type=int, default=1000, help="Pending engine moves before requests are refused")
+    parser.add_argument('--report', type=float, default=10, help="Seconds between stats lines (0 to disable)")
+    asyncio.run(run_server(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
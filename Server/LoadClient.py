@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+
+async def request(reader, writer, message):
+    writer.write((json.dumps(message) + '\n').encode())
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def legal_moves(game, board):
+    if game == 'connect4':
+        return [col for col, cell in enumerate(board[0]) if cell == '-']
+    return [row * 3 + col for row in range(3) for col in range(3) if board[row][col] == ' ']
+
+
+async def play_games(args, games, latencies, results):
+    # One connection playing random legal moves against the server's engine, one game after another
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    for _ in range(games):
+        start = time.time()
+        reply = await request(reader, writer, {"op": "new", "game": args.game, "engine": args.engine,
+                                               "engine_player": random.choice('XO'), "time_budget": args.time_budget})
+        latencies.append(time.time() - start)
+        while "error" not in reply and reply["winner"] is None:
+            start = time.time()
+            move = random.choice(legal_moves(args.game, reply["board"]))
+            reply = await request(reader, writer, {"op": "move", "session": reply["session"], "move": move})
+            latencies.append(time.time() - start)
+        results.append(reply.get("winner") or reply.get("error"))
+        await request(reader, writer, {"op": "close", "session": reply.get("session")})
+    writer.close()
+
+
+async def run(args):
+    latencies, results = [], []
+    start = time.time()
+    per_client = [args.games // args.clients + (client < args.games % args.clients) for client in range(args.clients)]
+    await asyncio.gather(*(play_games(args, games, latencies, results) for games in per_client if games))
+    elapsed = time.time() - start
+    latencies.sort()
+    print(f"{len(results)} games, {len(latencies)} requests in {elapsed:.1f}s ({len(latencies) / elapsed:.1f} requests/s)")
+    for p in (50, 90, 99):
+        print(f"  p{p} round trip: {latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000:.1f} ms")
+    print("  results:", {result: results.count(result) for result in set(results)})
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    print("  server:", await request(reader, writer, {"op": "stats"}))
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays many concurrent random games against GameServer.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Unix socket path of the server")
+    parser.add_argument('--game', default='connect4', choices=('connect4', 'tictactoe'))
+    parser.add_argument('--engine', default='default')
+    parser.add_argument('--clients', type=int, default=200, help="Concurrent connections, one game at a time each")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--time-budget', type=float, default=5, help="Engine seconds per game")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
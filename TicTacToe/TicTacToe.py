@@ -1,50 +1,27 @@
-from tqdm import tqdm
+import time
+STARTED = time.time()  # For the startup report
 import csv
+import glob
+import os
+import sys
+import threading
 import tkinter as tk
 from tkinter import messagebox, ttk
-from TicTacToeOpponents import *
+from TicTacToeGame import TicTacToe
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import TICTACTOE_RECORDS, GameRecordWriter, GameResultLog, aggregate_game_results, set_game_seed
+from Tournament import Tournament, log_tournament_results_to_csv
 
+PLAYER_COLORS = {'X': 'pink', 'O': 'light green'}
+EMPTY_COLOR = '#F0F0F0'
 
-class TicTacToe:
-    def __init__(self, player_x_strategy, player_o_strategy):
-        self.board = [[' ' for _ in range(3)] for _ in range(3)]
-        self.current_player = 'X'
-        self.strategies = {'X': player_x_strategy, 'O': player_o_strategy}
-
-    def make_move(self, row, col, player):
-        if self.is_move_valid(row, col):
-            self.board[row][col] = player
-            return True
-        return False
-
-    def is_move_valid(self, row, col):
-        return self.board[row][col] == ' '
-
-    def switch_player(self):
-        self.current_player = 'O' if self.current_player == 'X' else 'X'
-
-    def check_win(self, player):
-        # Check rows, columns, and diagonals for a win
-        win_conditions = [
-            [self.board[i][0] == self.board[i][1] == self.board[i][2] == player for i in range(3)],
-            [self.board[0][i] == self.board[1][i] == self.board[2][i] == player for i in range(3)],
-            [self.board[0][0] == self.board[1][1] == self.board[2][2] == player],
-            [self.board[0][2] == self.board[1][1] == self.board[2][0] == player]
-        ]
-        return any(any(row) for row in win_conditions)
-
-    def check_draw(self):
-        return all(self.board[row][col] != ' ' for row in range(3) for col in range(3))
-
-    def get_empty_cells(self):
-        return [(row, col) for row in range(3) for col in range(3) if self.board[row][col] == ' ']
-
-    def reset(self):
-        self.board = [[' ' for _ in range(3)] for _ in range(3)]
-        self.current_player = 'X'
 
 class GUI:
-    def __init__(self):
+    def __init__(self, warm_up=False):
+        # The engine module (numpy, tqdm) and the Q-table load the first time an algorithm is selected or used
+        self.engines = None  # The TicTacToeOpponents module once imported
+        self.q_learning_agent = None  # Kept between games so its Q-table is only read once
+        self.load_lock = threading.RLock()  # The warm-up thread and the GUI can ask for the same engine at once
         self.window = tk.Tk()
         self.window.geometry("500x500")
         self.window.title("Tic Tac Toe")
@@ -52,9 +29,11 @@ class GUI:
         self.player_x_option = tk.StringVar()
         self.player_o_option = tk.StringVar()
         self.player_options = ('Human', 'Computer')
-        self.algorithm_options = ('Minimax', 'Alpha-Beta Pruning', 'Default Opponent', 'Q-Learning Agent')
+        self.algorithm_options = ('Minimax', 'Alpha-Beta Pruning', 'Default Opponent', 'Q-Learning Agent', 'MCTS')
         self.buttons = [[None for _ in range(3)] for _ in range(3)]  # Will be initialized after starting the game
         self.initialize_options()
+        if warm_up:
+            self.warm_up(self.algorithm_options)
 
     def initialize_options(self):
         # Player X selection
@@ -71,6 +50,7 @@ class GUI:
         player_x_algorithm_dropdown['values'] = self.algorithm_options
         player_x_algorithm_dropdown.grid(column=3, row=0)
         player_x_algorithm_dropdown.current(0)  # set default value
+        player_x_algorithm_dropdown.bind("<<ComboboxSelected>>", lambda event: self.warm_up([self.player_x_algorithm_option.get()]))
 
         # Player O selection
         ttk.Label(self.window, text="Player O:").grid(column=0, row=1, padx=10, pady=10)
@@ -86,25 +66,28 @@ class GUI:
         player_o_algorithm_dropdown['values'] = self.algorithm_options
         player_o_algorithm_dropdown.grid(column=3, row=1)
         player_o_algorithm_dropdown.current(0)  # set default value
+        player_o_algorithm_dropdown.bind("<<ComboboxSelected>>", lambda event: self.warm_up([self.player_o_algorithm_option.get()]))
         
         self.train_button = ttk.Button(self.window, text="Train AI", command=self.train_ai)
         self.train_button.grid(column=1, row=2, columnspan=2, pady=10)
+
+        train_offline_button = ttk.Button(self.window, text="Train AI Offline", command=self.train_ai_offline)
+        train_offline_button.grid(column=1, row=3, columnspan=2, pady=10)
         
         analysis_button = ttk.Button(self.window, text="Analyze Performance", command=self.start_performance_analysis)
         analysis_button.grid(column=2, row=2, columnspan=4, pady=10)
 
+        tournament_button = ttk.Button(self.window, text="Run Tournament", command=self.start_tournament)
+        tournament_button.grid(column=3, row=3, pady=10)  # Beside Train Offline; row 2 is full
+
         play_button = ttk.Button(self.window, text="Play Game", command=self.start_game)
         play_button.grid(column=0, row=2, columnspan=2, pady=10)
 
     def initialize_board(self):
-        button_style = {'font': ('Helvetica', 15), 'bg': '#F0F0F0', 'activebackground': '#D0D0D0'}
-        # Destroy previous board if exists
-        for row in self.buttons:
-            for button in row:
-                if button is not None:
-                    button.destroy()
-
-        self.buttons = [[None for _ in range(3)] for _ in range(3)]
+        button_style = {'font': ('Helvetica', 15), 'bg': EMPTY_COLOR, 'activebackground': '#D0D0D0'}
+        if self.buttons[0][0] is not None:
+            self.clear_board()  # The buttons are created once and reused by every later game
+            return
         for i in range(3):
             for j in range(3):
                 button = tk.Button(self.window, height=3, width=6,
@@ -113,9 +96,13 @@ class GUI:
                 self.buttons[i][j] = button
 
     def update_button(self, row, col, player):
-        colors = {'X': 'pink', 'O': 'light green'}
         button = self.buttons[row][col]
-        button.config(text=player, state='disabled', disabledforeground='black', bg=colors[player])
+        button.config(text=player, state='disabled', disabledforeground='black', bg=PLAYER_COLORS[player])
+
+    def clear_board(self):
+        for row in self.buttons:
+            for button in row:
+                button.config(text='', state='normal', bg=EMPTY_COLOR)
 
     def check_game_over(self):
         if self.game.check_win(self.game.current_player):
@@ -146,9 +133,7 @@ class GUI:
 
     def reset_game(self):
         # Resets the game to its initial state
-        for row in self.buttons:
-            for button in row:
-                button.config(text='', state='normal', bg='SystemButtonFace')
+        self.clear_board()
         self.game.reset()
 
     def trigger_computer_move(self):
@@ -158,15 +143,37 @@ class GUI:
         and not self.check_game_over():
             self.window.after(400, self.perform_computer_move)
 
+    def load_engines(self):
+        # Imports the engine module on first use
+        with self.load_lock:
+            if self.engines is None:
+                start = time.time()
+                import TicTacToeOpponents
+                report_timing("Imported engine modules", start)
+                self.engines = TicTacToeOpponents
+        return self.engines
+
     def get_strategy(self, algorithm_name):
+        engines = self.load_engines()
         if algorithm_name == "Minimax":
-            return MinimaxOpponent()
+            return engines.MinimaxOpponent()
         elif algorithm_name == "Alpha-Beta Pruning":
-            return MinimaxWithAlphaBetaOpponent()
+            return engines.MinimaxWithAlphaBetaOpponent()
         elif algorithm_name == "Q-Learning Agent":
-            return QLearningOpponent()
+            with self.load_lock:
+                if self.q_learning_agent is None:
+                    start = time.time()
+                    self.q_learning_agent = engines.QLearningOpponent()
+                    report_timing(f"Loaded Q-table ({len(self.q_learning_agent.q_table)} states)", start)
+            return self.q_learning_agent
         elif algorithm_name == "Default Opponent":
-            return DefaultOpponent()
+            return engines.DefaultOpponent()
+        elif algorithm_name == "MCTS":
+            return engines.MCTSOpponent()
+
+    def warm_up(self, algorithms):
+        # Loads the engines for `algorithms` in a background thread, so the first game doesn't wait for them
+        threading.Thread(target=lambda: [self.get_strategy(algorithm) for algorithm in algorithms], daemon=True).start()
 
     def perform_computer_move(self):
         row, col = self.game.strategies[self.game.current_player].choose_move(self.game)
@@ -178,20 +185,21 @@ class GUI:
                 self.trigger_computer_move()
             
     def train_ai(self):
-        q_learning_agent = QLearningOpponent()
+        engines = self.load_engines()
+        q_learning_agent = engines.QLearningOpponent()
         
         # Define opponents for training
         opponents = [
-            MinimaxOpponent(),
-            MinimaxWithAlphaBetaOpponent(),
-            DefaultOpponent(),
-            QLearningOpponent()
+            engines.MinimaxOpponent(),
+            engines.MinimaxWithAlphaBetaOpponent(),
+            engines.DefaultOpponent(),
+            engines.QLearningOpponent()
         ]
 
         for opponent in opponents:
             # Dynamically adjust the game setup based on the opponent
             # Example: Q-learning agent as 'X' and opponent as 'O'
-            if isinstance(opponent, QLearningOpponent):
+            if isinstance(opponent, engines.QLearningOpponent):
                 # For Q-learning vs Q-learning, might want to adjust parameters or handle differently
                 self.game = TicTacToe(opponent, q_learning_agent)
             else:
@@ -203,46 +211,81 @@ class GUI:
 
         # After training against all opponents
         q_learning_agent.save_q_table()
+        self.q_learning_agent = None  # The next game reloads the new table
         print("Training complete.")
 
-    def start_performance_analysis(self):
+    def train_ai_offline(self):
+        # Learns from every game stored by earlier analysis runs instead of playing new ones
+        q_learning_agent = self.load_engines().QLearningOpponent()
+        record_files = glob.glob('*.tttr')
+        print(f"Training offline on {len(record_files)} record files...")
+        q_learning_agent.train_offline(record_files)
+        q_learning_agent.save_q_table()
+        self.q_learning_agent = None
+        print("Training complete.")
+
+    def start_performance_analysis(self, games=500, resume=True):
+        from tqdm import tqdm
         self.is_ai_playing = True  # Add this attribute to your __init__ method if it doesn't exist
-        games = 500  # Number of games for analysis
+        engines = self.load_engines()
         matchups = [
-            (MinimaxOpponent(), DefaultOpponent(), "Minimax vs Default"),
-            (MinimaxWithAlphaBetaOpponent(), DefaultOpponent(), "Alpha Beta vs Default"),
-            (DefaultOpponent(), QLearningOpponent(), "Default vs Q-Learning"),
-            (QLearningOpponent(), MinimaxOpponent(), "Q-Learning vs Minimax"),
-            (QLearningOpponent(), MinimaxWithAlphaBetaOpponent(), "Q-Learning vs Alpha Beta"),
-            (MinimaxOpponent(), MinimaxWithAlphaBetaOpponent(), "Minimax vs Alpha Beta")
+            (engines.MinimaxOpponent(), engines.DefaultOpponent(), "Minimax vs Default"),
+            (engines.MinimaxWithAlphaBetaOpponent(), engines.DefaultOpponent(), "Alpha Beta vs Default"),
+            (engines.DefaultOpponent(), engines.QLearningOpponent(), "Default vs Q-Learning"),
+            (engines.QLearningOpponent(), engines.MinimaxOpponent(), "Q-Learning vs Minimax"),
+            (engines.QLearningOpponent(), engines.MinimaxWithAlphaBetaOpponent(), "Q-Learning vs Alpha Beta"),
+            (engines.MinimaxOpponent(), engines.MinimaxWithAlphaBetaOpponent(), "Minimax vs Alpha Beta"),
+            (engines.MCTSOpponent(), engines.DefaultOpponent(), "MCTS vs Default"),
+            (engines.MinimaxWithAlphaBetaOpponent(), engines.MCTSOpponent(), "Alpha Beta vs MCTS")
         ]
 
-        results = []
-
-        for player_x_strategy, player_o_strategy, description in matchups:
+        # Every finished game is appended to the log, so an interrupted run resumes where it stopped
+        records = GameRecordWriter(f"tictactoe_performance_analysis_{games}.tttr", TICTACTOE_RECORDS, resume=resume)  # Full move lists
+        log = GameResultLog(f"tictactoe_performance_analysis_{games}.jsonl", resume=resume, records=records)
+        for matchup_index, (player_x_strategy, player_o_strategy, description) in enumerate(matchups):
             print(f"Starting {description}...")
-            x_wins, o_wins, draws = 0, 0, 0
-            for _ in tqdm(range(games)):
+            for game in tqdm(range(games)):
+                if log.is_recorded(description, game):
+                    continue
+                seed = matchup_index * games + game
+                set_game_seed(seed)
+                nodes = player_x_strategy.nodes + player_o_strategy.nodes
+                start = time.time()
                 winner = self.play_ai_vs_ai_game(player_x_strategy, player_o_strategy)
-                if winner == 'X':
-                    x_wins += 1
-                elif winner == 'O':
-                    o_wins += 1
-                else:  # Assume draws for any other result
-                    draws += 1
-            result = {
-                "Matchup": description,
-                "AI 1": player_x_strategy.__class__.__name__,
-                "AI 1 Wins": x_wins,
-                "AI 2": player_o_strategy.__class__.__name__,
-                "AI 2 Wins": o_wins,
-                "Draws": draws
-            }
-            results.append(result)
+                records.write(player_x_strategy.__class__.__name__, player_o_strategy.__class__.__name__,
+                              seed, winner, self.ai_game.moves)
+                log.append({
+                    "Matchup": description,
+                    "Game": game,
+                    "X": player_x_strategy.__class__.__name__,
+                    "O": player_o_strategy.__class__.__name__,
+                    "Seed": seed,
+                    "Winner": winner,
+                    "Moves": len(self.ai_game.moves),
+                    "Time": round(time.time() - start, 4),
+                    "Nodes": player_x_strategy.nodes + player_o_strategy.nodes - nodes
+                })
+        log.close()
+        records.close()
+        results = aggregate_game_results(log.filename, matchups, games)
 
         self.log_matchup_results_to_csv(results, games)
         self.is_ai_playing = False
     
+    def start_tournament(self):
+        # Round robin that stops each pairing as soon as the SPRT or the Elo interval settles it
+        self.is_ai_playing = True
+        engines = self.load_engines()
+        opponents = [engines.MinimaxOpponent(), engines.MinimaxWithAlphaBetaOpponent(), engines.DefaultOpponent(),
+                     engines.QLearningOpponent(), engines.MCTSOpponent()]
+        pairings, ratings = Tournament(self.play_tournament_game).run(opponents)
+        log_tournament_results_to_csv(pairings, ratings, "tournament_tictactoe.csv")
+        self.is_ai_playing = False
+
+    def play_tournament_game(self, player_x_strategy, player_o_strategy):
+        winner = self.play_ai_vs_ai_game(player_x_strategy, player_o_strategy)
+        return {'X': 1, 'O': 0}.get(winner, 0.5)
+
     def log_matchup_results_to_csv(self, results, games):
         filename = f'tictactoe_performance_analysis_{games}.csv' 
         with open(filename, mode='w', newline='') as file:
@@ -262,6 +305,7 @@ class GUI:
 
     def play_ai_vs_ai_game(self, player_x_strategy, player_o_strategy):
         game = TicTacToe(player_x_strategy, player_o_strategy)
+        self.ai_game = game  # Kept so callers can inspect the finished game
         while True:
             row, col = game.strategies[game.current_player].choose_move(game)
             game.make_move(row, col, game.current_player)
@@ -275,6 +319,14 @@ class GUI:
         self.window.mainloop()
 
 
+def report_timing(what, start):
+    print(f"{what} in {time.time() - start:.2f}s", flush=True)
+
+
 if __name__ == "__main__":
-    gui = GUI()
+    # Usage: python TicTacToe.py [--warm-up]  -- --warm-up loads every engine in the background after startup
+    report_timing("Imported the GUI", STARTED)
+    start = time.time()
+    gui = GUI(warm_up='--warm-up' in sys.argv)
+    report_timing("Window ready", start)
     gui.run()
@@ -0,0 +1,144 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from TicTacToeGame import TicTacToe
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import set_game_seed
+
+ENGINES = ('minimax', 'alpha-beta', 'mcts', 'default', 'q-learning')
+CHUNK = 256  # Positions per pool task
+
+engine = None  # Built once per worker process
+
+
+def init_worker(engine_name):
+    global engine
+    import TicTacToeOpponents as engines
+    engine = {
+        'minimax': engines.MinimaxOpponent,
+        'alpha-beta': engines.MinimaxWithAlphaBetaOpponent,
+        'mcts': engines.MCTSOpponent,
+        'default': engines.DefaultOpponent,
+        'q-learning': engines.QLearningOpponent,
+    }[engine_name]()
+    engine.epsilon = 0  # The Q-learning agent always plays its best known move here
+
+
+def parse_position(text):
+    # A 9-character board string (rows top to bottom, 'X', 'O' and '-' or '.' for empty), or a move sequence
+    # of cells numbered row * 3 + col, either as digits ("408") or separated by spaces or commas.
+    # Returns a TicTacToe with the player to move in current_player; raises ValueError if the game is over.
+    game = TicTacToe(None, None)
+    if len(text) == 9 and set(text) <= set('XO-.'):
+        game.board = [[' ' if cell in '-.' else cell for cell in text[row * 3:row * 3 + 3]] for row in range(3)]
+        x_count, o_count = text.count('X'), text.count('O')
+        if o_count not in (x_count, x_count - 1):
+            raise ValueError("impossible piece counts")
+        game.current_player = 'X' if x_count == o_count else 'O'
+        if game.check_win('X') or game.check_win('O'):
+            raise ValueError("game already won")
+    else:
+        moves = text.replace(',', ' ').split()
+        moves = list(moves[0]) if len(moves) == 1 else moves
+        for move in moves:
+            cell = int(move)
+            if not 0 <= cell < 9 or not game.make_move(*divmod(cell, 3), game.current_player):
+                raise ValueError(f"illegal move {move}")
+            if game.check_win(game.current_player):
+                raise ValueError("game already won")
+            game.switch_player()
+    if game.check_draw():
+        raise ValueError("board is full")
+    return game
+
+
+def analyze(line_number, text):
+    # One JSON-ready result: the engine's move (as row * 3 + col) and score for each empty cell, where the
+    # engine scores them
+    try:
+        game = parse_position(text)
+    except ValueError as error:
+        return {"line": line_number, "input": text, "error": str(error)}
+    set_game_seed(line_number)  # Tie-breaks depend on the position's line, not on which worker ran it
+    nodes = engine.nodes
+    start = time.time()
+    if hasattr(engine, 'score_moves'):
+        possible_moves = engine.score_moves(game)
+        row, col = engine.choose_from_scores(possible_moves)
+        scores = [None] * 9
+        for score, (i, j) in possible_moves:
+            scores[i * 3 + j] = score
+        score = scores[row * 3 + col]
+    else:
+        (row, col), score, scores = engine.choose_move(game), None, None
+    return {"line": line_number, "input": text, "to_move": game.current_player, "best_move": row * 3 + col,
+            "score": score, "scores": scores, "nodes": engine.nodes - nodes,
+            "time_ms": round((time.time() - start) * 1000, 3)}
+
+
+def analyze_chunk(chunk):
+    return [analyze(line_number, text) for line_number, text in chunk]
+
+
+def read_chunks(lines):
+    chunk = []
+    for line_number, line in enumerate(lines, 1):
+        text = line.strip()
+        if text and not text.startswith('#'):
+            chunk.append((line_number, text))
+            if len(chunk) == CHUNK:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(lines, output, engine_name, processes=None):
+    # Results are written in input order while later chunks are still being analysed. Only a few chunks per
+    # process are read ahead, so an input of any size streams through in constant memory.
+    processes = processes or multiprocessing.cpu_count()
+    count = 0
+    start = time.time()
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(engine_name,)) as pool:
+        pending = deque()
+        for chunk in read_chunks(lines):
+            pending.append(pool.apply_async(analyze_chunk, (chunk,)))
+            while len(pending) >= processes * 4:
+                count += write_results(pending.popleft().get(), output)
+        while pending:
+            count += write_results(pending.popleft().get(), output)
+    elapsed = time.time() - start
+    print(f"Analysed {count} positions in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s)", file=sys.stderr)
+
+
+def write_results(results, output):
+    output.write(''.join(json.dumps(result) + '\n' for result in results))
+    output.flush()
+    return len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyses Tic Tac Toe positions with one of the engines and "
+                                                 "writes one JSON line per position, in input order")
+    parser.add_argument('input', nargs='?', default='-', help="File of positions, one per line (default: stdin)")
+    parser.add_argument('--output', '-o', default='-', help="JSONL output file (default: stdout)")
+    parser.add_argument('--engine', default='alpha-beta', choices=ENGINES)
+    parser.add_argument('--processes', type=int, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    lines = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        run(lines, output, args.engine, args.processes)
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+class TicTacToe:
+    def __init__(self, player_x_strategy, player_o_strategy):
+        self.board = [[' ' for _ in range(3)] for _ in range(3)]
+        self.current_player = 'X'
+        self.strategies = {'X': player_x_strategy, 'O': player_o_strategy}
+        self.moves = []  # Cells played so far, as row * 3 + col
+
+    def make_move(self, row, col, player):
+        if self.is_move_valid(row, col):
+            self.board[row][col] = player
+            self.moves.append(row * 3 + col)
+            return True
+        return False
+
+    def is_move_valid(self, row, col):
+        return self.board[row][col] == ' '
+
+    def switch_player(self):
+        self.current_player = 'O' if self.current_player == 'X' else 'X'
+
+    def check_win(self, player):
+        # Check rows, columns, and diagonals for a win
+        win_conditions = [
+            [self.board[i][0] == self.board[i][1] == self.board[i][2] == player for i in range(3)],
+            [self.board[0][i] == self.board[1][i] == self.board[2][i] == player for i in range(3)],
+            [self.board[0][0] == self.board[1][1] == self.board[2][2] == player],
+            [self.board[0][2] == self.board[1][1] == self.board[2][0] == player]
+        ]
+        return any(any(row) for row in win_conditions)
+
+    def check_draw(self):
+        return all(self.board[row][col] != ' ' for row in range(3) for col in range(3))
+
+    def get_empty_cells(self):
+        return [(row, col) for row in range(3) for col in range(3) if self.board[row][col] == ' ']
+
+    def reset(self):
+        self.board = [[' ' for _ in range(3)] for _ in range(3)]
+        self.current_player = 'X'
+        self.moves = []
@@ -1,13 +1,27 @@
 import numpy as np
+import math
+import multiprocessing
+import os
 import pickle
 import random
+import sys
+import time
 from tqdm import tqdm
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import TICTACTOE_RECORDS, read_game_records
 
 
 class Opponent:
+    nodes = 0  # Positions searched over the opponent's lifetime, for analysis logs
+
     def choose_move(self, game):
         pass
 
+    def choose_from_scores(self, possible_moves):
+        # Picks randomly among the moves sharing the best score
+        best_score = max(score for score, move in possible_moves)
+        return random.choice([move for score, move in possible_moves if score == best_score])
+
     def evaluate(self, game):
         if game.check_win('X'):
             return 10
@@ -19,6 +33,7 @@ class Opponent:
 
 class MinimaxOpponent(Opponent):
     def minimax(self, game, depth, is_maximizing):
+        self.nodes += 1
         score = self.evaluate(game)
         if score == 10: # If Maximizer has won the game return evaluated score
             return score - depth
@@ -52,30 +67,25 @@ class MinimaxOpponent(Opponent):
                 game.board[i][j] = ' '
             return best
 
-    def choose_move(self, game):
-        best_score = -1000
+    def score_moves(self, game):
+        # (score, (row, col)) for every empty cell, from the point of view of the player to move
         possible_moves = []
-        # Traverse all cells and return the cell with optimal value.
+        player = game.current_player
+        sign = 1 if player == 'X' else -1  # X maximizes, so O picks the lowest score
         for (i, j) in game.get_empty_cells():
-            game.board[i][j] = 'X'  # Make the move as X (AI)
-            score = self.minimax(game, 0, False)  # Evaluate this move
+            game.board[i][j] = player  # Make the move as the player to move
+            score = sign * self.minimax(game, 0, player == 'O')  # Evaluate this move
             game.board[i][j] = ' '  # Undo the move
+            possible_moves.append((score, (i, j)))
+        return possible_moves
 
-            # If the value of the current move is more than the best score then
-            # update best score
-            if score > best_score:
-                best_score = score
-                possible_moves = [(score, (i,j))]
-            elif score == best_score:
-                possible_moves.append((score, (i,j)))
-        if len(possible_moves) > 1:
-            return random.choice([move for score, move in possible_moves])
-        else:
-            return possible_moves[0][1]
+    def choose_move(self, game):
+        return self.choose_from_scores(self.score_moves(game))
     
 
 class MinimaxWithAlphaBetaOpponent(Opponent):
     def minimax_with_alpha_beta(self, game, depth, is_maximizing, alpha, beta):
+        self.nodes += 1
         score = self.evaluate(game)
         if score == 10:  # If Maximizer has won the game return evaluated score
             return score - depth
@@ -115,27 +125,23 @@ class MinimaxWithAlphaBetaOpponent(Opponent):
                     break
             return best
 
-    def choose_move(self, game):
-        best_score = -1000
+    def score_moves(self, game):
+        # (score, (row, col)) for every empty cell, from the point of view of the player to move.
+        # Each root move gets the full window, so its score is exact.
         alpha = -1000
         beta = 1000
         possible_moves = []
-        # Traverse all cells and return the cell with optimal value.
+        player = game.current_player
+        sign = 1 if player == 'X' else -1  # X maximizes, so O picks the lowest score
         for (i, j) in game.get_empty_cells():
-            game.board[i][j] = 'X'  # Make the move as X (AI)
-            score = self.minimax_with_alpha_beta(game, 0, False, alpha, beta)  # Evaluate this move
-            game.board[i][j] = ' '  # Undo the move 
-            # If the value of the current move is more than the best score then
-            # update best score
-            if score > best_score:
-                best_score = score
-                possible_moves = [(score, (i,j))]
-            elif score == best_score:
-                possible_moves.append((score, (i,j)))
-        if len(possible_moves) > 1:
-            return random.choice([move for score, move in possible_moves])
-        else:
-            return possible_moves[0][1]
+            game.board[i][j] = player  # Make the move as the player to move
+            score = sign * self.minimax_with_alpha_beta(game, 0, player == 'O', alpha, beta)  # Evaluate this move
+            game.board[i][j] = ' '  # Undo the move
+            possible_moves.append((score, (i, j)))
+        return possible_moves
+
+    def choose_move(self, game):
+        return self.choose_from_scores(self.score_moves(game))
 
 
 class DefaultOpponent(Opponent):
@@ -172,6 +178,161 @@ class DefaultOpponent(Opponent):
         return game.get_empty_cells()[0]
 
 
+# Bitmasks of the eight winning lines on a board indexed row * 3 + col
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000, 0b001001001,
+             0b010010010, 0b100100100, 0b100010001, 0b001010100]
+FULL_MASK = 0b111111111
+
+
+def is_winning_mask(stones):
+    return any(stones & mask == mask for mask in WIN_MASKS)
+
+
+class MCTSNode:
+    __slots__ = ('move', 'key', 'children', 'untried', 'visits', 'wins', 'result')
+
+    def __init__(self, move, state, result=None):
+        self.move = move  # Cell index played to reach this node
+        self.key = state  # (stones of the player to move, stones of the other player)
+        self.children = {}
+        # Moves still to expand; none once the game is over
+        occupied = state[0] | state[1]
+        self.untried = [] if result is not None else [cell for cell in range(9) if not occupied >> cell & 1]
+        self.visits = 0
+        self.wins = 0.0  # From the point of view of the player who played `move`
+        self.result = result  # 1 if `move` won the game, 0.5 if it filled the board, None otherwise
+
+
+class MCTSOpponent(Opponent):
+    def __init__(self, playouts=2000, time_limit=None, exploration=1.4, playout_policy='default', processes=1):
+        if playouts is None and time_limit is None:
+            raise ValueError("MCTSOpponent needs a playout budget, a time limit or both")
+        self.playouts = playouts  # Playout budget per move and process; None to rely on time_limit only
+        self.time_limit = time_limit  # Optional budget in seconds per move, checked between playouts
+        self.exploration = exploration  # UCT exploration constant
+        self.playout_policy = playout_policy  # 'random' or 'default' (win, then block, then random)
+        self.processes = processes
+        self.pool = None  # Created on the first parallel search and reused between moves
+        self.root = None  # Tree from the previous move, reused when the game continues from it
+
+    def get_state(self, game):
+        current = other = 0
+        for row in range(3):
+            for col in range(3):
+                if game.board[row][col] == game.current_player:
+                    current |= 1 << (row * 3 + col)
+                elif game.board[row][col] != ' ':
+                    other |= 1 << (row * 3 + col)
+        return (current, other)
+
+    def playout(self, state):
+        # Plays to the end of the game; returns 1 if the player to move in `state` wins, 0 if they lose
+        current, other = state
+        outcome = 1  # Flips each ply so it always refers to the starting player
+        while current | other != FULL_MASK:
+            empty = [1 << cell for cell in range(9) if not (current | other) >> cell & 1]
+            move = None
+            if self.playout_policy == 'default':
+                move = next((bit for bit in empty if is_winning_mask(current | bit)), None)
+                if move is None:
+                    move = next((bit for bit in empty if is_winning_mask(other | bit)), None)
+            if move is None:
+                move = random.choice(empty)
+            if is_winning_mask(current | move):
+                return outcome
+            current, other = other, current | move
+            outcome = 1 - outcome
+        return 0.5
+
+    def expand(self, node):
+        current, other = node.key
+        cell = node.untried.pop(random.randrange(len(node.untried)))
+        stones = current | 1 << cell
+        result = 1 if is_winning_mask(stones) else (0.5 if stones | other == FULL_MASK else None)
+        child = MCTSNode(cell, (other, stones), result)
+        node.children[cell] = child
+        return child
+
+    def select_child(self, node):
+        log_visits = math.log(node.visits)
+        return max(node.children.values(), key=lambda child: child.wins / child.visits
+                   + self.exploration * math.sqrt(log_visits / child.visits))
+
+    def run_playout(self, root):
+        self.nodes += 1
+        node = root
+        path = [node]
+        while not node.untried and node.children:
+            node = self.select_child(node)
+            path.append(node)
+        if node.untried:
+            node = self.expand(node)
+            path.append(node)
+        value = node.result if node.result is not None else 1 - self.playout(node.key)
+        for visited in reversed(path):
+            visited.visits += 1
+            visited.wins += value
+            value = 1 - value
+
+    def search(self, root, playouts):
+        # playouts=None searches until the time limit runs out
+        start = time.time()
+        count = 0
+        while ((playouts is None or count < playouts) and
+               (self.time_limit is None or time.time() - start < self.time_limit)):
+            self.run_playout(root)
+            count += 1
+        return root
+
+    def reuse_tree(self, state):
+        # The new position is usually two plies below the previous root (our move, then theirs)
+        frontier = [self.root] if self.root is not None else []
+        for _ in range(3):
+            for node in frontier:
+                if node.key == state:
+                    return node
+            frontier = [child for node in frontier for child in node.children.values()]
+        return MCTSNode(None, state)
+
+    def choose_move(self, game):
+        state = self.get_state(game)
+        root = self.reuse_tree(state)
+        stats = {}
+        if self.processes > 1:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(self.processes - 1)
+            # Root parallelism: independent trees in the workers, merged by visit counts
+            jobs = [self.pool.apply_async(mcts_worker, (state, self.playouts, self.time_limit, self.exploration,
+                                                        self.playout_policy, random.randrange(2 ** 32)))
+                    for _ in range(self.processes - 1)]
+            self.search(root, self.playouts)
+            for job in jobs:
+                for cell, (visits, wins) in job.get().items():
+                    merged_visits, merged_wins = stats.get(cell, (0, 0.0))
+                    stats[cell] = (merged_visits + visits, merged_wins + wins)
+        else:
+            self.search(root, self.playouts)
+        for cell, child in root.children.items():
+            merged_visits, merged_wins = stats.get(cell, (0, 0.0))
+            stats[cell] = (merged_visits + child.visits, merged_wins + child.wins)
+        self.root = root
+        most_visits = max(visits for visits, _ in stats.values())
+        cell = random.choice([cell for cell, (visits, _) in stats.items() if visits == most_visits])
+        return divmod(cell, 3)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+
+def mcts_worker(state, playouts, time_limit, exploration, playout_policy, seed):
+    # Runs in a pool process; returns {cell: (visits, wins)} for the root's children
+    random.seed(seed)
+    searcher = MCTSOpponent(playouts, time_limit, exploration, playout_policy)
+    root = searcher.search(MCTSNode(None, state), playouts)
+    return {cell: (child.visits, child.wins) for cell, child in root.children.items()}
+
 class QLearningOpponent(Opponent):
     def __init__(self):
         self.q_table = {}
@@ -220,6 +381,61 @@ class QLearningOpponent(Opponent):
                 game.switch_player()
         self.save_q_table()
 
+    def load_transitions(self, record_files):
+        # Replays recorded games into (state, action, reward, next state, done) arrays for both sides' moves.
+        # Boards are encoded as X stones | O stones << 9 with cell index row * 3 + col.
+        states, actions, rewards, next_states, dones = [], [], [], [], []
+        for filename in record_files:
+            for record in read_game_records(filename, TICTACTOE_RECORDS):
+                boards = [0]
+                for ply, cell in enumerate(record.moves):
+                    boards.append(boards[-1] | 1 << (cell + (9 if ply % 2 else 0)))
+                last_ply = len(record.moves) - 1
+                for ply, cell in enumerate(record.moves):
+                    mover = 'X' if ply % 2 == 0 else 'O'
+                    states.append(boards[ply])
+                    actions.append(cell)
+                    if ply >= last_ply - 1:  # The game ended with this move or the opponent's reply
+                        rewards.append(1 if record.winner == mover else (0.5 if record.winner == 'Draw' else -1))
+                        next_states.append(boards[-1])
+                        dones.append(True)
+                    else:
+                        rewards.append(0)
+                        next_states.append(boards[ply + 2])
+                        dones.append(False)
+        return (np.array(states, dtype=np.int64), np.array(actions, dtype=np.int64), np.array(rewards, dtype=np.float64),
+                np.array(next_states, dtype=np.int64), np.array(dones, dtype=bool))
+
+    def bitmask_to_state(self, stones):
+        # Inverse of the encoding in load_transitions, in the get_state format
+        board = [['X' if stones >> (row * 3 + col) & 1 else 'O' if stones >> (row * 3 + col + 9) & 1 else ' '
+                  for col in range(3)] for row in range(3)]
+        return str(board)
+
+    def train_offline(self, record_files, passes=10):
+        # Batch Q-learning over recorded games: every pass updates all transitions at once with NumPy
+        states, actions, rewards, next_states, dones = self.load_transitions(record_files)
+        if len(states) == 0:
+            return
+        boards, inverse = np.unique(np.concatenate([states, next_states]), return_inverse=True)
+        state_index, next_state_index = inverse[:len(states)], inverse[len(states):]
+        names = [self.bitmask_to_state(int(stones)) for stones in boards]
+        cells = [divmod(cell, 3) for cell in range(9)]
+        q_values = np.array([[self.q_table.get((name, action), 0) for action in cells] for name in names], dtype=np.float64)
+        # Only empty cells count towards the best next action
+        occupied = ((boards[:, None] | boards[:, None] >> 9) >> np.arange(9)) & 1
+        # Transitions sharing a (state, action) pair are averaged into a single update per pass
+        pairs, pair_index, pair_counts = np.unique(state_index * 9 + actions, return_inverse=True, return_counts=True)
+        flat_q_values = q_values.reshape(-1)
+        for _ in tqdm(range(passes), desc="Offline training"):
+            next_max = np.where(occupied[next_state_index] == 1, -np.inf, q_values[next_state_index]).max(axis=1)
+            targets = rewards + self.gamma * np.where(dones, 0, next_max)
+            mean_targets = np.bincount(pair_index, weights=targets, minlength=len(pairs)) / pair_counts
+            flat_q_values[pairs] += self.learning_rate * (mean_targets - flat_q_values[pairs])
+        for pair in pairs:
+            state, cell = divmod(int(pair), 9)
+            self.q_table[(names[state], cells[cell])] = float(q_values[state, cell])
+
     def load_q_table(self):
         try:
             with open('q_table_tictactoe.pkl', 'rb') as f:
@@ -231,6 +447,11 @@ class QLearningOpponent(Opponent):
         with open('q_table_tictactoe.pkl', 'wb') as f:
             pickle.dump(self.q_table, f)
 
+    def score_moves(self, game):
+        # (Q-value, (row, col)) for every empty cell
+        state = self.get_state(game)
+        return [(self.q_table.get((state, action), 0), action) for action in game.get_empty_cells()]
+
     def choose_move(self, game):
         state = self.get_state(game)
         if np.random.uniform(0, 1) < self.epsilon:
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+from TicTacToe import EMPTY_COLOR, PLAYER_COLORS
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import TICTACTOE_RECORDS, GameRecordIndex
+
+FRAME_MS = 16  # About 60 redraws a second; faster replays apply several moves per redraw
+
+
+class ReplayViewer:
+    # Steps through the games of a record file at a chosen number of moves per second
+    def __init__(self, master, records, moves_per_second=2):
+        self.master = master
+        self.records = records
+        self.game_index = 0
+        self.playing = False
+        self.owed = 0.0  # Moves the clock has asked for but not yet applied
+        self.last_tick = time.time()
+
+        # One label per cell, created once; drawing only reconfigures the cells that changed
+        self.cells = []
+        for cell in range(9):
+            label = tk.Label(master, width=6, height=3, font=('Helvetica', 15), bg=EMPTY_COLOR, relief='raised')
+            label.grid(row=cell // 3, column=cell % 3 + 1, padx=4, pady=4)
+            self.cells.append(label)
+        self.drawn = [' '] * 9
+        self.play_button = ttk.Button(master, text="Play", command=self.toggle)
+        self.play_button.grid(row=3, column=0, pady=10)
+        ttk.Button(master, text="Step", command=lambda: self.advance(1)).grid(row=3, column=1)
+        ttk.Button(master, text="Previous Game", command=lambda: self.load_game(self.game_index - 1)).grid(row=3, column=2)
+        ttk.Button(master, text="Next Game", command=lambda: self.load_game(self.game_index + 1)).grid(row=3, column=3)
+        self.speed = tk.Scale(master, from_=1, to=1000, orient='horizontal', label="Moves per second")
+        self.speed.set(moves_per_second)
+        self.speed.grid(row=3, column=4, padx=10)
+        self.status = ttk.Label(master)
+        self.status.grid(row=4, column=0, columnspan=5, pady=5)
+        self.load_game(0)
+
+    def draw(self):
+        for cell, player in enumerate(self.board):
+            if self.drawn[cell] != player:
+                self.cells[cell].config(text=player, bg=PLAYER_COLORS.get(player, EMPTY_COLOR))
+                self.drawn[cell] = player
+
+    def load_game(self, index):
+        self.game_index = index % len(self.records)
+        self.record = self.records[self.game_index]  # Decoded once per game, not on every frame
+        self.board = [' '] * 9
+        self.ply = 0
+        self.draw()
+        self.show_status()
+
+    def advance(self, moves):
+        # Applies up to `moves` moves of the current game, then draws once
+        record = self.record
+        for _ in range(moves):
+            if self.ply == len(record.moves):
+                break
+            self.board[record.moves[self.ply]] = 'X' if self.ply % 2 == 0 else 'O'
+            self.ply += 1
+        self.draw()
+        self.show_status()
+
+    def show_status(self):
+        record = self.record
+        self.status.config(text=f"Game {self.game_index + 1}/{len(self.records)}: {record.x} (X) vs {record.o} (O), "
+                                f"move {self.ply}/{len(record.moves)}, winner {record.winner}")
+
+    def toggle(self):
+        self.playing = not self.playing
+        self.play_button.config(text="Pause" if self.playing else "Play")
+        if self.playing:
+            self.last_tick = time.time()
+            self.tick()
+
+    def tick(self):
+        if not self.playing:
+            return
+        now = time.time()
+        self.owed += (now - self.last_tick) * self.speed.get()
+        self.last_tick = now
+        if self.ply == len(self.record.moves):
+            self.load_game(self.game_index + 1)  # The finished game stays on screen for one frame
+            self.owed = 0.0
+        elif self.owed >= 1:
+            moves = int(self.owed)
+            self.owed -= moves
+            self.advance(moves)
+        self.master.after(FRAME_MS, self.tick)
+
+
+def main():
+    # Usage: python TicTacToeReplay.py <records file> [moves per second] [first game number]
+    if len(sys.argv) < 2:
+        print("Usage: python TicTacToeReplay.py <records file> [moves per second] [first game number]")
+        return
+    records = GameRecordIndex(sys.argv[1], TICTACTOE_RECORDS)  # Games are decoded one at a time as they are shown
+    if not len(records):
+        print(f"No games in {sys.argv[1]}")
+        records.close()
+        return
+    root = tk.Tk()
+    root.title("Tic Tac Toe Replay")
+    viewer = ReplayViewer(root, records, int(sys.argv[2]) if len(sys.argv) > 2 else 2)
+    if len(sys.argv) > 3:
+        viewer.load_game(int(sys.argv[3]) - 1)
+    root.mainloop()
+    records.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Connect4'))
+from Connect4Solver import Position, Solver, popcount
+
+
+def brute_force(position, table):
+    # Plain minimax over the whole remaining game, in the solver's score convention
+    key = position.key()
+    if key in table:
+        return table[key]
+    cells = position.width * position.height
+    playable = [col for col in range(position.width) if position.can_play(col)]
+    if any(position.is_winning_move(col) for col in playable):
+        score = (cells + 1 - position.moves) // 2
+    elif not playable:
+        score = 0
+    else:
+        score = -cells
+        for col in playable:
+            child = position.copy()
+            child.play_col(col)
+            score = max(score, -brute_force(child, table))
+    table[key] = score
+    return score
+
+
+def random_position(rng, empty_cells, width=7, height=6):
+    # A position reached by random moves that never end the game, with `empty_cells` cells left
+    while True:
+        position = Position(width, height)
+        while position.moves < width * height - empty_cells:
+            columns = [col for col in range(width) if position.can_play(col) and not position.is_winning_move(col)]
+            if not columns:
+                break
+            position.play_col(rng.choice(columns))
+        else:
+            return position
+
+
+def test_solve_matches_brute_force():
+    rng = random.Random(1)
+    table = {}
+    for _ in range(30):
+        position = random_position(rng, 10)
+        assert Solver().solve(position) == brute_force(position, table)
+
+
+def test_analyze_matches_brute_force_per_column():
+    rng = random.Random(2)
+    table = {}
+    cells = 42
+    for _ in range(10):
+        position = random_position(rng, 9)
+        expected = [None] * position.width
+        for col in range(position.width):
+            if not position.can_play(col):
+                continue
+            if position.is_winning_move(col):
+                expected[col] = (cells + 1 - position.moves) // 2
+            else:
+                child = position.copy()
+                child.play_col(col)
+                expected[col] = -brute_force(child, table)
+        assert Solver().analyze(position) == expected
+
+
+def test_small_board_from_empty():
+    # Small enough to brute-force the whole game
+    position = Position(4, 4)
+    assert Solver().solve(position) == brute_force(position, {})
+
+
+def test_from_moves_uses_zero_based_columns():
+    position = Position.from_moves("3342")
+    stones = [popcount(position.mask & position.column_mask(col)) for col in range(position.width)]
+    assert stones == [0, 0, 1, 2, 1, 0, 0]
+    assert Position.from_moves("").key() == Position().key()
+    for bad in ("7", "3333333"):
+        try:
+            Position.from_moves(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} should be rejected")
+
+
+def test_weak_solve_has_the_right_sign():
+    rng = random.Random(3)
+    table = {}
+    for _ in range(10):
+        position = random_position(rng, 10)
+        exact = brute_force(position, table)
+        weak = Solver().solve(position, weak=True)  # Only the sign is meaningful
+        assert (weak > 0) - (weak < 0) == (exact > 0) - (exact < 0)
@@ -0,0 +1,48 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Connect4'))
+from Connect4Game import Connect4Game
+from Connect4Solver import Position, Solver
+from Connect4Tablebase import Tablebase, build_tablebase, load_tablebase, seed_positions
+
+
+def board_of(position):
+    # The game's list of rows (top row first) for a Position, with X as the first player
+    x_to_move = position.moves % 2 == 0
+    board = [['-'] * position.width for _ in range(position.height)]
+    for col in range(position.width):
+        for row in range(position.height):
+            bit = 1 << (col * (position.height + 1) + (position.height - 1 - row))
+            if position.mask & bit:
+                board[row][col] = 'X' if bool(position.current & bit) == x_to_move else 'O'
+    return board
+
+
+def test_build_and_probe_round_trip(tmp_path):
+    filename = str(tmp_path / "tablebase.bin")
+    random.seed(5)
+    build_tablebase(max_empty=8, random_games=10, filename=filename)
+    tablebase = Tablebase(filename)
+    assert (tablebase.rows, tablebase.cols, tablebase.max_empty) == (6, 7, 8)
+    random.seed(5)  # The same seed positions the table was built from
+    solver = Solver()
+    for position in seed_positions(8, (), 10):
+        assert tablebase.probe(position) == solver.solve(position)
+        game = Connect4Game()
+        player = 'X' if position.moves % 2 == 0 else 'O'
+        game.board = board_of(position)
+        scores = solver.analyze(position)
+        assert sorted(tablebase.probe_moves(game, player)) == sorted(
+            (score, col) for col, score in enumerate(scores) if score is not None)
+
+
+def test_unknown_positions(tmp_path):
+    filename = str(tmp_path / "tablebase.bin")
+    random.seed(6)
+    build_tablebase(max_empty=6, random_games=2, filename=filename)
+    tablebase = Tablebase(filename)
+    assert tablebase.probe(Position()) is None  # Far more empty cells than the table holds
+    assert tablebase.probe_moves(Connect4Game(6, 7, 3), 'X') is None  # Not four in a row
+    assert load_tablebase(str(tmp_path / "missing.bin")) is None
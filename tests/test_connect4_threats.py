@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Connect4'))
+from Connect4Solver import Position
+from Connect4Threats import ThreatAnalysis
+
+
+def analyze(*rows, player='X'):
+    # The bottom rows of a 6x7 board, highest first, as strings of 'X', 'O' and '-'
+    board = ['-------'] * (6 - len(rows)) + list(rows)
+    return ThreatAnalysis(Position.from_board([list(row) for row in board], player))
+
+
+def test_immediate_win():
+    threats = analyze('----O--', 'XXX-OO-')
+    assert threats.winning_moves == [3]
+    assert not threats.is_lost()
+
+
+def test_forced_block():
+    threats = analyze('------X', 'XOOO--X')
+    assert threats.winning_moves == []
+    assert threats.forced_blocks == [4]
+    assert threats.safe_moves() == [4]
+    assert not threats.is_lost()
+
+
+def test_two_threats_cannot_both_be_blocked():
+    threats = analyze('-----X-', '-OOO-XX')
+    assert threats.forced_blocks == [0, 4]
+    assert threats.is_lost()
+
+
+def test_double_threat_moves():
+    # Either move next to the pair makes an open three with both ends playable
+    threats = analyze('------O', '--XX--O')
+    assert threats.winning_moves == [] and threats.forced_blocks == []
+    assert threats.double_threat_moves() == [1, 4]
+
+
+def test_safe_moves_avoid_playing_under_a_threat():
+    # O threatens both ends of its three on the second row; filling the cell below either hands O the win
+    threats = analyze('-OOO--X', '-XOX--X')
+    assert threats.forced_blocks == []
+    assert threats.safe_moves() == [1, 2, 3, 5, 6]
@@ -0,0 +1,96 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Common'))
+from GameRecords import (CONNECT4_RECORDS, TICTACTOE_RECORDS, GameRecord, GameRecordIndex, GameRecordWriter,
+                         GameResultLog, read_game_records)
+
+GAMES = [
+    GameRecord('Minimax', 'Default Opponent', 0, 'X', [3, 3, 4, 2, 5, 6, 1]),
+    GameRecord('Default Opponent', 'Minimax', 2 ** 40 + 5, 'O', [0, 6, 0, 6, 1, 6, 2, 6]),
+    GameRecord('Minimax', 'MCTS', 127, 'Draw', []),
+]
+
+
+def write_games(filename, games, record_format=CONNECT4_RECORDS):
+    writer = GameRecordWriter(filename, record_format, resume=False)
+    for game in games:
+        writer.write(*game)
+    writer.close()
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / "games.c4r")
+    write_games(filename, GAMES)
+    assert list(read_game_records(filename, CONNECT4_RECORDS)) == GAMES
+
+
+def test_round_trip_tictactoe(tmp_path):
+    filename = str(tmp_path / "games.tttr")
+    games = [GameRecord('Minimax', 'Q-Learning', 7, 'X', [4, 0, 8, 2, 6, 1, 7, 5, 3])]
+    write_games(filename, games, TICTACTOE_RECORDS)
+    assert list(read_game_records(filename, TICTACTOE_RECORDS)) == games
+
+
+def test_truncated_entry_is_skipped(tmp_path):
+    filename = str(tmp_path / "games.c4r")
+    write_games(filename, GAMES[:2])
+    size = os.path.getsize(filename)
+    for cut in range(1, 6):  # Anywhere inside the last game entry
+        with open(filename, 'r+b') as file:
+            file.truncate(size - cut)
+        assert list(read_game_records(filename, CONNECT4_RECORDS)) == GAMES[:1]
+
+
+def test_truncated_name_entry_is_skipped(tmp_path):
+    filename = str(tmp_path / "games.c4r")
+    write_games(filename, GAMES[:1])
+    with open(filename, 'ab') as file:
+        file.write(bytes([0, 2]))  # Cut off inside the name entry of a new player
+    assert list(read_game_records(filename, CONNECT4_RECORDS)) == GAMES[:1]
+
+
+def test_index_gives_random_access(tmp_path):
+    filename = str(tmp_path / "games.c4r")
+    write_games(filename, GAMES)
+    records = GameRecordIndex(filename, CONNECT4_RECORDS)
+    assert len(records) == len(GAMES)
+    assert [records[index] for index in (2, 0, 1, -1)] == [GAMES[2], GAMES[0], GAMES[1], GAMES[-1]]
+    records.close()
+
+
+def test_empty_file_has_no_games(tmp_path):
+    filename = str(tmp_path / "games.c4r")
+    open(filename, 'wb').close()
+    assert list(read_game_records(filename, CONNECT4_RECORDS)) == []
+
+
+def test_resume_drops_partial_entry_and_appends(tmp_path):
+    filename = str(tmp_path / "games.c4r")
+    write_games(filename, GAMES[:2])
+    with open(filename, 'r+b') as file:
+        file.truncate(os.path.getsize(filename) - 2)
+    writer = GameRecordWriter(filename, CONNECT4_RECORDS, resume=True)
+    writer.write(*GAMES[2])
+    writer.close()
+    assert list(read_game_records(filename, CONNECT4_RECORDS)) == [GAMES[0], GAMES[2]]
+
+
+def test_resume_keeps_only_logged_games(tmp_path):
+    # Records synced after the log's last flush are dropped, so a resumed run doesn't record them twice
+    records_file, log_file = str(tmp_path / "games.c4r"), str(tmp_path / "games.jsonl")
+    records = GameRecordWriter(records_file, CONNECT4_RECORDS, resume=False)
+    log = GameResultLog(log_file, flush_every=2, resume=False, records=records)
+    for number, game in enumerate(GAMES):
+        records.write(*game)
+        log.append({"Matchup": "m", "Game": number})
+    records.flush()  # Interrupted before the log wrote its last line
+
+    records = GameRecordWriter(records_file, CONNECT4_RECORDS, resume=True)
+    log = GameResultLog(log_file, flush_every=2, resume=True, records=records)
+    assert log.is_recorded("m", 1) and not log.is_recorded("m", 2)
+    records.write(*GAMES[2])
+    log.append({"Matchup": "m", "Game": 2})
+    log.close()
+    records.close()
+    assert list(read_game_records(records_file, CONNECT4_RECORDS)) == GAMES
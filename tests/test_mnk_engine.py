@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'MNK'))
+from MNKEngine import MNKBoard, MNKSearch
+
+
+def full_score(board):
+    # The window-count score recomputed from scratch, from X's point of view
+    lines = board.lines
+    score = 0
+    for mask in lines.masks:
+        x_count = bin(board.stones[0] & mask).count('1')
+        o_count = bin(board.stones[1] & mask).count('1')
+        score += lines.contribution(x_count, o_count)
+    return score
+
+
+def test_win_detection():
+    board = MNKBoard(3, 3, 3, gravity=False)
+    for cell in (0, 3, 4, 5):  # X, O, X, O
+        assert not board.play(cell)
+    assert board.play(8)  # X completes the diagonal 0-4-8
+    assert board.winner == 'X'
+    assert board.check_win('X') and not board.check_win('O')
+
+
+def test_gravity_win_detection():
+    board = MNKBoard(6, 7, 4, gravity=True)
+    for col in (0, 6, 0, 6, 0, 6):
+        board.play(board.legal_moves()[col])
+    assert board.winner is None
+    assert board.play(board.cell(2, 0))  # Fourth X stone stacked in column 0
+    assert board.winner == 'X' and board.check_win('X')
+
+
+def test_make_undo_symmetry():
+    rng = random.Random(4)
+    for rows, cols, k, gravity in ((6, 7, 4, True), (3, 3, 3, False), (9, 9, 5, False)):
+        board = MNKBoard(rows, cols, k, gravity)
+        states = []
+        while board.winner is None and not board.is_full():
+            states.append((list(board.stones), [counts[:] for counts in board.counts], board.heights[:],
+                           board.score, board.to_move, board.legal_moves()))
+            board.play(rng.choice(board.legal_moves()))
+            assert board.score == full_score(board)  # The incremental score matches a full recount
+        while states:
+            board.undo()
+            assert (list(board.stones), board.counts, board.heights, board.score, board.to_move,
+                    board.legal_moves()) == states.pop()
+        assert board.history == [] and board.winner is None
+
+
+def test_search_takes_an_immediate_win_and_blocks():
+    board = MNKBoard(3, 3, 3, gravity=False)
+    for cell in (0, 3, 1):  # X threatens 2, O to move must block
+        board.play(cell)
+    assert MNKSearch(depth=2).choose_move(board) == 2
+    board.play(4)  # O ignores it
+    assert MNKSearch(depth=1).choose_move(board) == 2